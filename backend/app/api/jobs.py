@@ -0,0 +1,58 @@
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.services.jobs import job_manager, QueueFull
+
+router = APIRouter(tags=["Jobs"])
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def _job(job_id):
+    try:
+        return job_manager.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+
+
+@router.post("/jobs", status_code=202)
+def submit_job():
+    """Queue a run of the active rules over the demo dataset"""
+    try:
+        job, deduplicated = job_manager.submit()
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**job.snapshot(), "deduplicated": deduplicated}
+
+
+@router.get("/jobs")
+def list_jobs():
+    return {"jobs": job_manager.jobs(), "stats": job_manager.stats()}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return _job(job_id).snapshot()
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str):
+    """Server-sent events: every progress event of the job, until it finishes"""
+    job = _job(job_id)
+
+    def events():
+        sent = 0
+        while True:
+            batch = job_manager.wait_events(job, sent, timeout=STREAM_KEEPALIVE_SECONDS)
+            if not batch:
+                yield ": keep-alive\n\n"
+            for event in batch:
+                yield f"data: {json.dumps(event)}\n\n"
+            sent += len(batch)
+            if job.finished and sent >= len(job.events):
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream")
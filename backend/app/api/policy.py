@@ -1,12 +1,32 @@
+import asyncio
+import os
+
 from fastapi import APIRouter, UploadFile, File, HTTPException
 
 from app.services.pdf_parser import extract_text_from_pdf_bytes
-from app.services.llm_extractor import extract_rules_json_with_llm
+from app.services.llm_extractor import extract_rules_json_with_llm, extractor_identity, get_rule_extractor
+from app.services.workers import run_in_thread, run_disk_io, WorkTimeout, PDF_TIMEOUT_SECONDS, LLM_TIMEOUT_SECONDS
 from app.schemas.rules import PolicyRules
-from app.storage.rules_store import save_rules_json
+from app.storage.rules_store import rule_store
+from app.storage.extraction_cache import (
+    extraction_cache, pdf_text_key, rules_key, TEXT_NAMESPACE, RULES_NAMESPACE,
+)
 
 router = APIRouter(tags=["Policy"])
 
+# At most this many uploads are parsed/extracted at once; others wait for a
+# slot up to UPLOAD_QUEUE_TIMEOUT_SECONDS and are then turned away.
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", "4"))
+UPLOAD_QUEUE_TIMEOUT_SECONDS = float(os.getenv("UPLOAD_QUEUE_TIMEOUT_SECONDS", "30"))
+_upload_slots = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+
+
+def _release_slot_when_done(pending):
+    """Release an upload slot once timed-out work has actually stopped running"""
+    loop = asyncio.get_running_loop()
+    pending.add_done_callback(lambda _: loop.call_soon_threadsafe(_upload_slots.release))
+
+
 @router.post("/upload-policy")
 async def upload_policy(file: UploadFile = File(...)):
 
@@ -28,13 +48,46 @@ async def upload_policy(file: UploadFile = File(...)):
     if not pdf_bytes:
         raise HTTPException(status_code=400, detail="Empty file")
 
-    # Extract text
-    policy_text = extract_text_from_pdf_bytes(pdf_bytes)
-    if not policy_text.strip():
-        raise HTTPException(status_code=400, detail="Could not extract text")
+    try:
+        await asyncio.wait_for(_upload_slots.acquire(), UPLOAD_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many policy uploads in progress, try again later")
+
+    # A timed-out PDF parse or LLM call keeps running in its thread, so it
+    # keeps the slot until it finishes; otherwise stuck calls would pile up
+    # beyond MAX_CONCURRENT_UPLOADS.
+    slot_held = True
+    try:
+        # Extract text unless this exact PDF was seen before. Pages are
+        # parsed on the process pool; the thread only gathers them.
+        text_key = pdf_text_key(pdf_bytes)
+        policy_text = await run_disk_io(extraction_cache.get_text, TEXT_NAMESPACE, text_key)
+        if policy_text is None:
+            try:
+                policy_text = await run_in_thread(extract_text_from_pdf_bytes, pdf_bytes, timeout=PDF_TIMEOUT_SECONDS)
+            except WorkTimeout as e:
+                slot_held = False
+                _release_slot_when_done(e.pending)
+                raise HTTPException(status_code=504, detail="PDF text extraction timed out")
+            await run_disk_io(extraction_cache.put_text, TEXT_NAMESPACE, text_key, policy_text)
+        if not policy_text.strip():
+            raise HTTPException(status_code=400, detail="Could not extract text")
 
-    # Call LLM
-    llm_json = extract_rules_json_with_llm(policy_text)
+        # Call LLM (blocking network call, on the thread pool), unless the
+        # same text was already extracted with the current model and prompt
+        json_key = rules_key(policy_text, extractor_identity())
+        llm_json = await run_disk_io(extraction_cache.get_json, RULES_NAMESPACE, json_key)
+        cached_rules = llm_json is not None
+        if not cached_rules:
+            try:
+                llm_json = await run_in_thread(extract_rules_json_with_llm, policy_text, timeout=LLM_TIMEOUT_SECONDS)
+            except WorkTimeout as e:
+                slot_held = False
+                _release_slot_when_done(e.pending)
+                raise HTTPException(status_code=504, detail="Rule extraction timed out")
+    finally:
+        if slot_held:
+            _upload_slots.release()
 
     # Validate JSON schema
     try:
@@ -42,10 +95,45 @@ async def upload_policy(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Invalid rule JSON: {str(e)}")
 
-    # Save JSON
-    save_rules_json(parsed.model_dump())
+    # Only validated extractions are cached
+    if not cached_rules:
+        await run_disk_io(extraction_cache.put_json, RULES_NAMESPACE, json_key, parsed.model_dump())
+
+    # Save JSON as a new rule version and make it active
+    try:
+        version = await run_disk_io(rule_store.save, parsed.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid rule JSON: {str(e)}")
 
     return {
         "message": "Policy processed successfully",
-        "rules": parsed.model_dump()
-    }
\ No newline at end of file
+        "cached": cached_rules,
+        "rules_version": version.version,
+        "rules": version.policy
+    }
+
+
+@router.get("/rules")
+def active_rules():
+    version = rule_store.current()
+    return {"rules_version": version.version, "rules": version.policy}
+
+
+@router.get("/rules/versions")
+def rule_versions():
+    return {"versions": rule_store.versions()}
+
+
+@router.post("/rules/versions/{version}/activate")
+def activate_rule_version(version: str):
+    try:
+        activated = rule_store.activate(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown rules version {version}")
+    return {"rules_version": activated.version, "rules": activated.policy}
+
+
+@router.get("/extractor-stats")
+def extractor_stats():
+    """Model call counters, retries and latency/token histograms"""
+    return get_rule_extractor().stats()
@@ -0,0 +1,124 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+
+from app.rule_engine import dataset_registry, decode_rule_mask
+from app.rule_engine.loader import TIME_COLUMN
+from app.storage.results_store import result_store
+
+router = APIRouter(tags=["Runs"])
+
+ACCOUNT_COLUMNS = ["From Account", "To Account"]
+MAX_PAGE_SIZE = 1000
+
+
+def violation_records(df, row_ids, rule_mask, rule_ids):
+    """Transaction rows for `row_ids` with the rules each one triggered"""
+    rows = df.take(row_ids)
+    rows.index = pd.Index(row_ids, name="row_id")
+    rows = rows.reset_index()
+    rows["triggered_rules"] = [decode_rule_mask(m, rule_ids) for m in rule_mask]
+    return rows.to_dict(orient="records")
+
+
+def _run_dataset(meta, extra_columns=()):
+    """Resident dataset the run was computed on, or 409 if it has changed"""
+    columns = meta.get("columns")
+    if columns is not None:
+        columns = sorted(set(columns) | set(extra_columns))
+    try:
+        dataset = dataset_registry.entry(meta["dataset_path"], columns=columns)
+    except FileNotFoundError:
+        raise HTTPException(status_code=409, detail="Dataset of this run no longer exists")
+    if list(dataset.version) != list(meta["dataset_version"]):
+        raise HTTPException(status_code=409, detail="Dataset changed since this run; re-run the policy")
+    return dataset
+
+
+def filter_violations(dataset, row_ids, rule_mask, rule_bit=None, account=None, start=None, end=None):
+    """
+    Positions (into row_ids) of violations matching every given filter.
+    Each filter only looks at the rows that survived the previous ones.
+    """
+    keep = np.arange(len(row_ids))
+    if rule_bit is not None:
+        keep = keep[(rule_mask[keep] >> rule_bit & 1).astype(bool)]
+
+    if account is not None:
+        df = dataset.df
+        hit = np.zeros(len(keep), dtype=bool)
+        for column in ACCOUNT_COLUMNS:
+            hit |= df[column].take(row_ids[keep]).to_numpy() == account
+        keep = keep[hit]
+
+    if start is not None or end is not None:
+        times = dataset.context.timestamps(TIME_COLUMN)[row_ids[keep]]
+        hit = np.ones(len(keep), dtype=bool)
+        if start is not None:
+            hit &= times >= pd.Timestamp(start).value
+        if end is not None:
+            hit &= times < pd.Timestamp(end).value
+        keep = keep[hit]
+
+    return keep
+
+
+@router.get("/runs")
+def list_runs():
+    return {"runs": result_store.runs()}
+
+
+@router.get("/runs/{run_id}")
+def get_run(run_id: str):
+    try:
+        return result_store.meta(run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown run {run_id}")
+
+
+@router.get("/runs/{run_id}/violations")
+def get_run_violations(
+    run_id: str,
+    rule: Optional[str] = None,
+    account: Optional[str] = None,
+    start: Optional[str] = Query(None, description="inclusive, e.g. 2022/09/01 00:20"),
+    end: Optional[str] = Query(None, description="exclusive"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+):
+    """One page of a stored run's violations, optionally filtered"""
+    try:
+        meta = result_store.meta(run_id)
+        row_ids, rule_mask = result_store.arrays(run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown run {run_id}")
+
+    rule_ids = meta["rule_ids"]
+    rule_bit = None
+    if rule is not None:
+        if rule not in rule_ids:
+            raise HTTPException(status_code=400, detail=f"Rule {rule} is not part of run {run_id}")
+        rule_bit = rule_ids.index(rule)
+
+    extra_columns = []
+    if account is not None:
+        extra_columns += ACCOUNT_COLUMNS
+    if start is not None or end is not None:
+        extra_columns.append(TIME_COLUMN)
+    dataset = _run_dataset(meta, extra_columns)
+
+    try:
+        keep = filter_violations(dataset, row_ids, rule_mask, rule_bit, account, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
+
+    page = keep[offset:offset + limit]
+    return {
+        "run_id": run_id,
+        "total": len(keep),
+        "offset": offset,
+        "limit": limit,
+        "violations": violation_records(dataset.df, row_ids[page], rule_mask[page], rule_ids),
+    }
@@ -1,9 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.rule_engine import execute_policy, compute_metrics, load_rules, load_dataset
+from fastapi.responses import PlainTextResponse
+from app.rule_engine import dataset_registry, instrumentation
 from app.api.policy import router as policy_router
+from app.api.runs import router as runs_router, violation_records
+from app.api.jobs import router as jobs_router
+from app.storage.results_store import result_store
+from app.services.policy_runs import run_policy
+from app.services.jobs import job_manager
+from app.rule_engine.parallel import shutdown_pools as shutdown_rule_pools
+from app.services.workers import shutdown_pools as shutdown_service_pools
+from app.services.llm_extractor import set_rule_extractor
+import logging
 import os
 
+# Rule engine progress goes through logging; LOG_LEVEL=INFO/DEBUG shows it
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
 app = FastAPI(title="ComplianceAI", version="1.0")
 
 # Allow your frontend (Vite default) to call backend
@@ -15,6 +28,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+def shutdown_worker_pools():
+    shutdown_rule_pools()
+    shutdown_service_pools()
+    set_rule_extractor(None)
+    job_manager.shutdown()
+
 @app.get("/")
 def root():
     return {"status": "ok", "message": "ComplianceAI backend running"}
@@ -22,32 +42,35 @@ def root():
 @app.post("/run-demo")
 def run_demo():
     print("\n🔥 Demo execution started...")
-    BASE_DIR = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "../../")
-    )
+    run, dataset = run_policy()
+    row_ids, rule_mask = result_store.arrays(run["run_id"])
 
-    DATA_PATH = os.path.join(BASE_DIR, "data", "HI-Small_Trans.csv")
-
-    # 1. Load policy and dataset
-    policy = load_rules("app/rules/latest_rules.json")
-    df = load_dataset(DATA_PATH)
+    return {
+        "run_id": run["run_id"],
+        "policy_name": run["policy_name"],
+        "rules_version": run["rules_version"],
+        "total_transactions": run["total_transactions"],
+        "violations_found": run["violations"],
+        "violations_by_rule": run["rule_counts"],
+        "metrics": run["metrics"],
+        "sample_violations": violation_records(dataset.df, row_ids[:5], rule_mask[:5], run["rule_ids"])
+    }
 
-    # 2. Execute rules
-    violations = execute_policy(policy["rules"], df)
+@app.get("/dataset-stats")
+def dataset_stats():
+    return {"datasets": dataset_registry.stats()}
 
-    # 3. Compute metrics (if label exists)
-    if "is_laundering" in df.columns:
-        metrics = compute_metrics(df, violations)
-    else:
-        metrics = None
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Rule engine stage/rule timings and row counts, Prometheus text format"""
+    return PlainTextResponse(instrumentation.render_prometheus(), media_type="text/plain; version=0.0.4")
 
-    return {
-        "policy_name": policy["policy_name"],
-        "total_transactions": len(df),
-        "violations_found": len(violations),
-        "metrics": metrics,
-        "sample_violations": violations.head(5).to_dict(orient="records")
-    }
+@app.get("/trace-spans")
+def trace_spans():
+    """Recent spans when RULE_ENGINE_TRACE=1"""
+    return {"enabled": instrumentation.trace, "spans": instrumentation.spans()}
 
 # API routes
-app.include_router(policy_router, prefix="/api")
\ No newline at end of file
+app.include_router(policy_router, prefix="/api")
+app.include_router(runs_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
\ No newline at end of file
@@ -1,4 +1,10 @@
 # rule_engine/__init__.py
-from .interpreter import execute_policy
-from .metrics import compute_metrics
-from .loader import load_rules, load_dataset
\ No newline at end of file
+from .interpreter import execute_policy, compile_policy, required_columns, decode_rule_mask
+from .executors import register_executor, EXECUTORS
+from .metrics import compute_metrics, metrics_from_row_ids
+from .loader import load_rules, load_dataset, ensure_parquet, convert_csv_to_parquet, LABEL_COLUMN
+from .datasets import dataset_registry, get_dataset
+from .incremental import IncrementalState
+from .streaming import stream_policy, ParquetViolationSink, MemoryViolationSink
+from .parallel import execute_policy_parallel, configured_workers
+from .instrumentation import instrumentation, span
@@ -0,0 +1,137 @@
+# rule_engine/context.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .graph import build_account_graph
+from .sorted_index import RANGE_OPERATORS, build_sorted_index, comparable_values, indexable
+from .windows import build_group_time_index, group_codes, shared_codes, timestamps_ns
+
+# Comparison and window masks are len(df) bytes each and rule parameters
+# change often, so only the most recently used ones are kept.
+MAX_CACHED_MASKS = 32
+
+
+class ExecutionContext:
+    """
+    Derived data for one dataset version, computed lazily and memoized.
+
+    Rules that need parsed timestamps, the (account, time) sort order, a
+    column's sorted index or a column comparison ask the context instead of
+    recomputing them. A context
+    held by the dataset registry lives as long as the dataset version, so
+    these are shared across requests as well as across rules.
+    """
+
+    def __init__(self, df, version=None):
+        self.df = df
+        self.version = version
+        self._values = {}
+        self._masks = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, key, compute):
+        if key in self._values:
+            return self._values[key]
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._values:
+                self._values[key] = compute()
+        return self._values[key]
+
+    def memo(self, key, compute):
+        """Memoize any other derived value under a hashable key"""
+        return self._memo(key, compute)
+
+    def values(self, column):
+        """Column as a numpy array"""
+        return self._memo(("values", column), lambda: self.df[column].to_numpy())
+
+    def numeric_values(self, column):
+        """Numeric column widened to float64 if narrower, for threshold comparisons"""
+        return self._memo(("numeric_values", column), lambda: comparable_values(self.values(column)))
+
+    def timestamps(self, column):
+        """int64 nanoseconds per row (NaT as int64 min)"""
+        return self._memo(("timestamps", column), lambda: timestamps_ns(self.df[column]))
+
+    def codes(self, column):
+        """Integer category code per row (-1 for missing)"""
+        return self._memo(("codes", column), lambda: group_codes(self.df[column]))
+
+    def shared_codes(self, left, right):
+        """Codes of two columns over a common domain, for column-to-column equality"""
+        return self._memo(("shared_codes", left, right), lambda: shared_codes(self.df[left], self.df[right]))
+
+    def group_time_index(self, group_column, time_column):
+        """Rows sorted by (group, time) plus group boundaries"""
+        return self._memo(
+            ("group_time_index", group_column, time_column),
+            lambda: build_group_time_index(self.codes(group_column), self.timestamps(time_column)),
+        )
+
+    def account_graph(self, sender_column, receiver_column, time_column):
+        """Transfer graph between accounts (CSR both ways), see graph.py"""
+        return self._memo(
+            ("account_graph", sender_column, receiver_column, time_column),
+            lambda: build_account_graph(*self.shared_codes(sender_column, receiver_column), self.timestamps(time_column)),
+        )
+
+    def sorted_index(self, column):
+        """Row order and sorted values of a numeric column, see sorted_index.py"""
+        return self._memo(("sorted_index", column), lambda: build_sorted_index(self.numeric_values(column)))
+
+    def range_rows(self, column, op_symbol, value):
+        """
+        Row positions where `column <op> value`, by binary search in the
+        column's sorted index. None when the index doesn't apply (column not
+        numeric, value not a number) or isn't worth building: only a context
+        tied to a dataset version is reused, a throwaway one (a plain
+        execute_policy call, a stream chunk, a partition or a batch) would
+        pay an O(n log n) sort for one O(n) comparison. compare() handles
+        those.
+        """
+        if self.version is None:
+            return None
+        if op_symbol not in RANGE_OPERATORS or not indexable(self.df[column], value):
+            return None
+        return self.sorted_index(column).rows(op_symbol, value)
+
+    def compare(self, column, op_symbol, value, op_func):
+        """
+        Boolean mask of `column <op> value`, LRU-cached per (column, op,
+        value). Numeric columns are compared as numeric_values(), the same
+        values the sorted index holds, so both paths agree.
+        """
+        def compute():
+            series = self.df[column]
+            if indexable(series, value):
+                return op_func(self.numeric_values(column), value)
+            return op_func(series, value)
+
+        return self.mask(("compare", column, op_symbol, value), compute)
+
+    def mask(self, key, compute):
+        """
+        Full-length boolean row mask memoized under `key` in a bounded LRU
+        (MAX_CACHED_MASKS), for masks that vary with rule parameters and
+        would otherwise pile up for as long as the dataset version lives.
+        """
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+
+        mask = np.asarray(compute(), dtype=bool)
+        mask.flags.writeable = False
+
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > MAX_CACHED_MASKS:
+                self._masks.popitem(last=False)
+        return mask
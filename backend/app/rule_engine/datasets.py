@@ -0,0 +1,142 @@
+# rule_engine/datasets.py
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .context import ExecutionContext
+from .loader import DATA_PATH, load_dataset
+
+
+@dataclass
+class DatasetEntry:
+    """One resident dataset plus the file version it was loaded from"""
+    path: str
+    version: tuple
+    df: pd.DataFrame
+    load_seconds: float
+    memory_bytes: int
+    columns: tuple = None
+    loaded_at: float = field(default_factory=time.time)
+    hits: int = 0
+    context: ExecutionContext = field(default=None, repr=False)
+
+    def __post_init__(self):
+        # Derived-column cache tied to this dataset version. Built with the
+        # entry (under the registry's per-path load lock) rather than on
+        # first use, so concurrent first runs can't each build their own.
+        if self.context is None:
+            self.context = ExecutionContext(self.df, self.version)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "rows": len(self.df),
+            "columns": list(self.df.columns),
+            "mtime_ns": self.version[0],
+            "size_bytes": self.version[1],
+            "load_seconds": round(self.load_seconds, 4),
+            "memory_bytes": self.memory_bytes,
+            "loaded_at": self.loaded_at,
+            "hits": self.hits,
+        }
+
+
+def file_version(path):
+    """(mtime_ns, size) of a file - cheap to stat, changes on any rewrite"""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class DatasetRegistry:
+    """
+    Process-wide cache of loaded datasets keyed by absolute path.
+
+    Each file is loaded once and the same DataFrame is handed to every caller,
+    so it must be treated as read-only. The file is re-stat'ed on every lookup
+    and reloaded only when its mtime or size changes.
+    """
+
+    def __init__(self, loader=load_dataset):
+        self._loader = loader
+        self._entries = {}
+        self._path_locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_for(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _covers(entry, version, columns):
+        if entry is None or entry.version != version:
+            return False
+        if entry.columns is None:
+            return True
+        return columns is not None and set(columns) <= set(entry.columns)
+
+    def entry(self, path=DATA_PATH, columns=None):
+        """
+        Resident entry for `path`. With `columns`, only those columns need to
+        be present; a cached projection that lacks some of them is reloaded
+        with the union of old and new columns.
+        """
+        path = os.path.abspath(path)
+        version = file_version(path)
+
+        entry = self._entries.get(path)
+        if self._covers(entry, version, columns):
+            entry.hits += 1
+            return entry
+
+        # One loader per path: concurrent requests wait for the same load
+        # instead of each reading their own copy.
+        with self._lock_for(path):
+            entry = self._entries.get(path)
+            version = file_version(path)
+            if self._covers(entry, version, columns):
+                entry.hits += 1
+                return entry
+
+            if columns is not None and entry is not None and entry.version == version:
+                if entry.columns is None:
+                    columns = None
+                else:
+                    columns = sorted(set(entry.columns) | set(columns))
+
+            started = time.perf_counter()
+            df = self._loader(path, columns=columns)
+            elapsed = time.perf_counter() - started
+
+            entry = DatasetEntry(
+                path=path,
+                version=version,
+                df=df,
+                load_seconds=elapsed,
+                memory_bytes=int(df.memory_usage(deep=True).sum()),
+                columns=tuple(columns) if columns is not None else None,
+            )
+            self._entries[path] = entry
+            return entry
+
+    def get(self, path=DATA_PATH, columns=None):
+        return self.entry(path, columns).df
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self):
+        return [entry.stats() for entry in list(self._entries.values())]
+
+
+dataset_registry = DatasetRegistry()
+
+
+def get_dataset(path=DATA_PATH, columns=None):
+    return dataset_registry.get(path, columns)
@@ -0,0 +1,303 @@
+# rule_engine/executors.py
+"""
+Rule executors, keyed by rule type.
+
+An executor is a kernel `evaluate(rule, ctx)` that returns a boolean mask
+of len(ctx.df), an int array of flagged row positions, or None when the
+rule can't run on this dataset and is skipped. Next to it, it declares
+the columns a rule reads (only those get loaded) and the columns its time
+windows group rows by (parallel and incremental execution use them to
+decide whether rows can be split). Kernels read arrays from the
+ExecutionContext instead of slicing the frame, so rules sharing derived
+data (parsed timestamps, sort orders, comparisons) don't recompute it.
+
+A rule names its executor with `rule_type`; rules saved before that field
+existed get it inferred from their shape. New rule types plug in with
+register_executor().
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .fields import OPERATOR_MAP, map_field
+from .graph import graph_columns, graph_rows, graph_window_columns
+from .predicates import compound_mask, condition_columns, condition_window_fields
+from .windows import frequency_row_ids, window_aggregate_row_ids
+
+logger = logging.getLogger(__name__)
+
+
+def _no_windows(rule):
+    return []
+
+
+@dataclass(frozen=True)
+class Executor:
+    rule_type: str
+    evaluate: Callable
+    columns: Callable
+    window_columns: Callable = _no_windows
+
+
+EXECUTORS = {}
+
+
+def register_executor(rule_type, evaluate, columns, window_columns=None):
+    """Add (or replace) the executor for `rule_type`"""
+    executor = Executor(rule_type, evaluate, columns, window_columns or _no_windows)
+    EXECUTORS[rule_type] = executor
+    return executor
+
+
+def infer_rule_type(rule):
+    """Rule type of a rule without `rule_type`, from its JSON structure"""
+    if rule.get("condition"):
+        return "compound"
+    if rule.get("graph"):
+        return "graph"
+    if rule.get("aggregate"):
+        return "window_aggregate"
+    if rule.get("time_window_minutes") is not None:
+        return "frequency"
+    if rule.get("sender_bank_field") and rule.get("receiver_bank_field"):
+        return "column_compare"
+    if rule.get("compare_field"):
+        return "column_compare"
+    if rule.get("payment_methods"):
+        return "payment_method"
+    return "threshold"
+
+
+def rule_kind(rule):
+    """Explicit `rule_type`, or the one inferred from the rule's fields"""
+    return rule.get("rule_type") or infer_rule_type(rule)
+
+
+def with_rule_types(policy):
+    """Copy of a policy whose rules all carry an explicit rule_type"""
+    return {**policy, "rules": [{**rule, "rule_type": rule_kind(rule)} for rule in policy.get("rules", [])]}
+
+
+def executor_for(rule):
+    """Executor of a rule; ValueError for an unknown rule_type"""
+    kind = rule_kind(rule)
+    executor = EXECUTORS.get(kind)
+    if executor is None:
+        raise ValueError(f"Rule {rule.get('rule_id')} has unknown rule_type '{kind}'")
+    return executor
+
+
+def rule_columns(rule):
+    """Dataset columns one rule reads"""
+    columns = []
+    for name in executor_for(rule).columns(rule):
+        column = map_field(name)
+        if column and column not in columns:
+            columns.append(column)
+    return columns
+
+
+def window_group_columns(rule):
+    """Columns a rule's time windows group rows by (empty if it has none)"""
+    return executor_for(rule).window_columns(rule)
+
+
+def threshold_rows(rule, ctx):
+    df = ctx.df
+    logger.debug("🔎 Executing Rule %s (Threshold Rule)", rule.get("rule_id", "Unknown"))
+
+    # map field and skip if None
+    field = map_field(rule.get("field"))
+    if not field or field not in df.columns:
+        logger.warning("⚠️ Skipping rule %s - field is missing or None", rule.get("rule_id"))
+        return None
+
+    operator_symbol = rule.get("operator")
+    threshold = rule.get("threshold")
+
+    op_func = OPERATOR_MAP.get(operator_symbol)
+    if not op_func:
+        logger.warning("⚠️ Skipping rule %s - unsupported operator %s", rule.get("rule_id"), operator_symbol)
+        return None
+
+    # Numeric thresholds are a slice of the column's sorted index
+    rows = ctx.range_rows(field, operator_symbol, threshold)
+    if rows is not None:
+        return rows
+    return ctx.compare(field, operator_symbol, threshold, op_func)
+
+
+def compare_columns(rule):
+    """(left, right) dataset columns of a column-to-column rule"""
+    if rule.get("sender_bank_field") and rule.get("receiver_bank_field"):
+        return map_field(rule["sender_bank_field"]), map_field(rule["receiver_bank_field"])
+    return map_field(rule.get("field")), map_field(rule.get("compare_field"))
+
+
+def column_compare_mask(rule, ctx):
+    """
+    Rows where `left <op> right` holds for two columns of the same row, e.g.
+    From Bank != To Bank for cross-bank rules (the default operator is !=).
+
+    Equality on categorical or text columns compares integer codes over a
+    shared dictionary instead of strings; rows missing either value are
+    never flagged.
+    """
+    df = ctx.df
+    logger.debug("🔎 Executing Rule %s (Column Comparison Rule)", rule.get("rule_id"))
+
+    left, right = compare_columns(rule)
+    if not left or not right or left not in df.columns or right not in df.columns:
+        logger.warning("⚠️ Skipping rule %s - compared fields %s / %s are missing", rule.get("rule_id"), left, right)
+        return None
+
+    operator_symbol = rule.get("operator") or "!="
+    op_func = OPERATOR_MAP.get(operator_symbol)
+    if not op_func:
+        logger.warning("⚠️ Skipping rule %s - unsupported operator %s", rule.get("rule_id"), operator_symbol)
+        return None
+
+    numeric = all(
+        pd.api.types.is_numeric_dtype(df[col]) and not isinstance(df[col].dtype, pd.CategoricalDtype)
+        for col in (left, right)
+    )
+    if numeric:
+        left_values = ctx.values(left).astype(np.float64)
+        right_values = ctx.values(right).astype(np.float64)
+        return op_func(left_values, right_values) & ~(np.isnan(left_values) | np.isnan(right_values))
+
+    if operator_symbol not in ("==", "!="):
+        logger.warning("⚠️ Skipping rule %s - operator %s needs numeric columns", rule.get("rule_id"), operator_symbol)
+        return None
+
+    left_codes, right_codes = ctx.shared_codes(left, right)
+    return op_func(left_codes, right_codes) & (left_codes >= 0) & (right_codes >= 0)
+
+
+def frequency_rows(rule, ctx):
+    df = ctx.df
+    # Check for required fields in rule
+    required_rule_fields = ["time_window_minutes", "transaction_count_threshold"]
+    if any(rule.get(f) is None for f in required_rule_fields):
+        logger.warning("⚠️ Skipping Rule %s due to missing rule parameters", rule.get("rule_id"))
+        return None
+
+    logger.debug("🔎 Executing Rule %s (Frequency Rule)", rule["rule_id"])
+    time_window = rule["time_window_minutes"]
+    txn_threshold = rule["transaction_count_threshold"]
+
+    account_field = map_field("account_id")
+    time_field = map_field("transaction_time")
+
+    # Check that these fields exist in the dataframe
+    for f in [account_field, time_field]:
+        if f not in df.columns:
+            logger.warning("⚠️ Skipping Rule %s because field '%s' is missing in dataset", rule.get("rule_id"), f)
+            return None
+
+    # One (account, time) sort and a searchsorted window count over the
+    # whole frame; rows with unparseable timestamps are never flagged.
+    index = ctx.group_time_index(account_field, time_field)
+    return frequency_row_ids(index, time_window, txn_threshold)
+
+
+# Which side of the transfer windowed aggregates are grouped by
+AGGREGATE_GROUPS = {
+    "account": "account_id",
+    "counterparty": "receiver_account",
+}
+
+
+def aggregate_group_column(rule):
+    return map_field(AGGREGATE_GROUPS.get(rule.get("group_by") or "account", rule.get("group_by")))
+
+
+def window_aggregate_rows(rule, ctx):
+    """
+    Rows whose account's (or counterparty's) trailing window of
+    `time_window_minutes` has sum/mean/max of `field` (default amount)
+    <operator> threshold, e.g. structuring: sum > 10000 within 24h over
+    transactions each below 10000 (`amount_below`).
+    """
+    df = ctx.df
+    logger.debug("🔎 Executing Rule %s (Window Aggregate Rule)", rule.get("rule_id"))
+
+    if rule.get("time_window_minutes") is None or rule.get("threshold") is None:
+        logger.warning("⚠️ Skipping Rule %s due to missing rule parameters", rule.get("rule_id"))
+        return None
+
+    group_field = aggregate_group_column(rule)
+    time_field = map_field("transaction_time")
+    value_field = map_field(rule.get("field") or "amount")
+    for f in [group_field, time_field, value_field]:
+        if f not in df.columns:
+            logger.warning("⚠️ Skipping Rule %s because field '%s' is missing in dataset", rule.get("rule_id"), f)
+            return None
+
+    operator_symbol = rule.get("operator") or ">"
+    op_func = OPERATOR_MAP.get(operator_symbol)
+    if not op_func:
+        logger.warning("⚠️ Skipping rule %s - unsupported operator %s", rule.get("rule_id"), operator_symbol)
+        return None
+
+    values = ctx.numeric_values(value_field)
+    include = values < rule["amount_below"] if rule.get("amount_below") is not None else None
+
+    index = ctx.group_time_index(group_field, time_field)
+    try:
+        return window_aggregate_row_ids(
+            index, values, rule["time_window_minutes"], rule["aggregate"], op_func, rule["threshold"], include,
+        )
+    except ValueError as e:
+        logger.warning("⚠️ Skipping rule %s - %s", rule.get("rule_id"), e)
+        return None
+
+
+def payment_method_rows(rule, ctx):
+    df = ctx.df
+    logger.debug("🔎 Executing Rule %s (Payment Method Rule)", rule["rule_id"])
+    methods = rule["payment_methods"]
+    threshold = rule.get("threshold") or 0
+
+    payment_field = map_field("payment_method")
+    amount_field = map_field("amount")
+
+    if payment_field not in df.columns:
+        raise ValueError(f"❌ {payment_field} column missing")
+
+    # Amount range first (from the sorted index when possible), then the
+    # payment method of just those rows
+    rows = ctx.range_rows(amount_field, ">", threshold)
+    if rows is None:
+        rows = np.flatnonzero(ctx.compare(amount_field, ">", threshold, OPERATOR_MAP[">"]))
+
+    series = df[payment_field]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Match on the integer codes of the wanted categories
+        wanted = series.cat.categories.get_indexer(methods)
+        return rows[np.isin(ctx.codes(payment_field)[rows], wanted[wanted >= 0])]
+    return rows[pd.Series(ctx.values(payment_field)[rows]).isin(methods).to_numpy()]
+
+
+register_executor("threshold", threshold_rows, lambda rule: [rule.get("field")])
+register_executor(
+    "frequency", frequency_rows,
+    lambda rule: ["account_id", "transaction_time"],
+    lambda rule: [map_field("account_id")],
+)
+register_executor("payment_method", payment_method_rows, lambda rule: ["payment_method", "amount"])
+register_executor("column_compare", column_compare_mask, lambda rule: list(compare_columns(rule)))
+register_executor(
+    "compound", compound_mask,
+    lambda rule: condition_columns(rule["condition"]),
+    lambda rule: condition_window_fields(rule["condition"]),
+)
+register_executor(
+    "window_aggregate", window_aggregate_rows,
+    lambda rule: [aggregate_group_column(rule), "transaction_time", rule.get("field") or "amount"],
+    lambda rule: [aggregate_group_column(rule)],
+)
+register_executor("graph", graph_rows, graph_columns, graph_window_columns)
@@ -0,0 +1,33 @@
+# rule_engine/fields.py
+import operator
+
+OPERATOR_MAP = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Field mapping from logical names in rules → actual CSV columns
+FIELD_MAP = {
+    "transaction_time": "Timestamp",
+    "amount": "Amount Paid",           # use Amount Received if needed
+    "sender_bank_field": "From Bank",
+    "receiver_bank_field": "To Bank",
+    "sender_bank": "From Bank",
+    "receiver_bank": "To Bank",
+    "sender_account": "From Account",
+    "receiver_account": "To Account",
+    "account_id": "From Account",      # or To Account depending on use case
+    "payment_method": "Payment Format",
+    "field":""
+
+}
+
+def map_field(field):
+    """Map rule field to actual CSV column, return None if missing"""
+    if field in FIELD_MAP:
+        return FIELD_MAP[field] or None
+    return field if field else None
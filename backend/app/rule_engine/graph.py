@@ -0,0 +1,312 @@
+# rule_engine/graph.py
+"""
+Graph rules over the transfer graph: every transaction is an edge from the
+sender to the receiver account.
+
+    fan_out / fan_in: more than `counterparty_threshold` distinct receivers
+        (senders) within the account's trailing `time_window_minutes`, or
+        over all of its earlier transactions without a window
+    cycle: money comes back to the sender through at most
+        `max_cycle_length` (2 or 3) transfers, each no earlier than the one
+        before it, all within `time_window_minutes`
+
+Accounts are integer-encoded over the shared sender/receiver dictionary
+and the edges are kept in CSR form per direction (each account's edges
+contiguous and sorted by time). Times are replaced by their rank among
+all edge times, so "edges of account v between t0 and t1" is a pair of
+searchsorted calls on one int64 key per edge. Self-transfers are left out.
+"""
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from .fields import map_field
+from .windows import NS_PER_MINUTE, window_starts
+
+logger = logging.getLogger(__name__)
+
+GRAPH_RULES = ("fan_out", "fan_in", "cycle")
+
+# Upper bound on two-transfer paths materialized at once by cycle search
+MAX_PATHS = 1 << 22
+
+
+@dataclass
+class Adjacency:
+    """
+    Edges grouped by one endpoint (`nodes`, ascending) and sorted by time
+    within each group. Edges of node v are indptr[v]:indptr[v + 1];
+    `neighbors` holds the other endpoint and `rows` the transaction.
+    """
+    indptr: np.ndarray
+    nodes: np.ndarray
+    neighbors: np.ndarray
+    times: np.ndarray
+    rows: np.ndarray
+    keys: np.ndarray
+    span: int
+
+    def between(self, nodes, start_ranks, stop_ranks):
+        """Edge range [start, stop) of each node with time rank in [start_rank, stop_rank)"""
+        base = nodes.astype(np.int64) * self.span
+        return np.searchsorted(self.keys, base + start_ranks), np.searchsorted(self.keys, base + stop_ranks)
+
+
+@dataclass
+class AccountGraph:
+    n_accounts: int
+    time_values: np.ndarray
+    outgoing: Adjacency
+    incoming: Adjacency
+    pairs: Adjacency
+    pair_values: np.ndarray
+
+    def ranks(self, times, side="left"):
+        """Rank of each time among edge times, for Adjacency.between"""
+        return np.searchsorted(self.time_values, times, side=side)
+
+
+def _adjacency(nodes, neighbors, times, time_ranks, rows, n_nodes, span):
+    order = np.lexsort((time_ranks, nodes))
+    nodes = nodes[order]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(nodes, minlength=n_nodes))]).astype(np.int64)
+    return Adjacency(
+        indptr=indptr,
+        nodes=nodes,
+        neighbors=neighbors[order],
+        times=times[order],
+        rows=rows[order],
+        keys=nodes * span + time_ranks[order],
+        span=span,
+    )
+
+
+def build_account_graph(sender_codes, receiver_codes, times):
+    """
+    CSR adjacency both ways plus an index by (sender, receiver) pair, from
+    shared account codes (see windows.shared_codes) and int64 times.
+    """
+    valid = (sender_codes >= 0) & (receiver_codes >= 0) & (times != np.iinfo(np.int64).min)
+    valid &= sender_codes != receiver_codes
+    rows = np.flatnonzero(valid)
+    senders, receivers, times = sender_codes[rows], receiver_codes[rows], times[rows]
+
+    n_accounts = int(max(senders.max(), receivers.max())) + 1 if len(rows) else 0
+    time_values, time_ranks = np.unique(times, return_inverse=True)
+    time_ranks = time_ranks.astype(np.int64)
+    # One slot past the last rank, so a range can end after the latest time
+    span = np.int64(len(time_values) + 1)
+
+    # Pairs are numbered densely in (sender, receiver) order, so a pair's
+    # edges form one run sorted by time, like a node's edges in CSR
+    pair_keys = senders * np.int64(max(n_accounts, 1)) + receivers
+    pair_values, pair_ids = np.unique(pair_keys, return_inverse=True)
+
+    return AccountGraph(
+        n_accounts=n_accounts,
+        time_values=time_values,
+        outgoing=_adjacency(senders, receivers, times, time_ranks, rows, n_accounts, span),
+        incoming=_adjacency(receivers, senders, times, time_ranks, rows, n_accounts, span),
+        pairs=_adjacency(pair_ids.astype(np.int64), receivers, times, time_ranks, rows, len(pair_values), span),
+        pair_values=pair_values,
+    )
+
+
+def _pair_ids(graph, senders, receivers):
+    """Dense pair id of each sender -> receiver pair, and whether the pair occurs at all"""
+    keys = senders * np.int64(max(graph.n_accounts, 1)) + receivers
+    if not len(graph.pair_values):
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    pair_ids = np.minimum(np.searchsorted(graph.pair_values, keys), len(graph.pair_values) - 1)
+    return pair_ids, graph.pair_values[pair_ids] == keys
+
+
+def _pair_edges(graph, senders, receivers, start_times, stop_times):
+    """Edge range [start, stop) in graph.pairs of sender -> receiver transfers in [start_time, stop_time]"""
+    pair_ids, exists = _pair_ids(graph, senders, receivers)
+    start, stop = graph.pairs.between(pair_ids, graph.ranks(start_times), graph.ranks(stop_times, side="right"))
+    return start, np.where(exists, stop, start)
+
+
+def distinct_neighbor_counts(adjacency, window_ns=None):
+    """
+    Per edge: distinct neighbors among its node's edges in the trailing
+    window (t - window, t] up to and including the edge (all earlier edges
+    without a window).
+
+    An edge counts for the windows it is the latest edge to its neighbor
+    in: from itself up to just before the next edge to the same neighbor,
+    or until the window start moves past it. Window starts never decrease,
+    so that range is one searchsorted away and all ranges are summed with
+    a difference array.
+    """
+    n_edges = len(adjacency.nodes)
+    positions = np.arange(n_edges)
+    if window_ns is None:
+        starts = adjacency.indptr[adjacency.nodes]
+    else:
+        starts = window_starts(adjacency.nodes, adjacency.times, window_ns)
+
+    by_pair = np.lexsort((positions, adjacency.neighbors, adjacency.nodes))
+    same_pair = (adjacency.nodes[by_pair[1:]] == adjacency.nodes[by_pair[:-1]]) & (
+        adjacency.neighbors[by_pair[1:]] == adjacency.neighbors[by_pair[:-1]]
+    )
+    next_same = np.full(n_edges, n_edges, dtype=np.int64)
+    next_same[by_pair[:-1][same_pair]] = by_pair[1:][same_pair]
+
+    until = np.minimum(next_same, np.searchsorted(starts, positions, side="right"))
+    changes = 1 - np.bincount(until, minlength=n_edges + 1)[:n_edges]
+    return np.cumsum(changes)
+
+
+def fan_row_ids(adjacency, counterparty_threshold, window_minutes=None):
+    """Rows whose account has more than `counterparty_threshold` distinct counterparties in the window"""
+    window_ns = None if window_minutes is None else int(window_minutes * NS_PER_MINUTE)
+    counts = distinct_neighbor_counts(adjacency, window_ns)
+    return np.sort(adjacency.rows[counts > counterparty_threshold])
+
+
+def _expand(starts, stops):
+    """Flattened positions of the ranges [start, stop), plus the range each came from"""
+    lengths = stops - starts
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, starts[owner] + offsets
+
+
+def _chunks(lengths, budget):
+    """Slices of consecutive ranges whose total length stays around `budget`"""
+    totals = np.cumsum(lengths)
+    begin = 0
+    while begin < len(lengths):
+        base = totals[begin - 1] if begin else 0
+        end = max(int(np.searchsorted(totals, base + budget, side="right")), begin + 1)
+        yield slice(begin, end)
+        begin = end
+
+
+def _two_cycle_rows(graph, window_ns):
+    """Transfers a -> b with a transfer b -> a at most the window before or after"""
+    pairs = graph.pairs
+    n = np.int64(max(graph.n_accounts, 1))
+    reverse, has_reverse = _pair_ids(graph, graph.pair_values % n, graph.pair_values // n)
+
+    # Most pairs never go the other way; only edges of those that do are searched
+    edges = np.flatnonzero(has_reverse[pairs.nodes])
+    times = pairs.times[edges]
+    start, stop = pairs.between(
+        reverse[pairs.nodes[edges]], graph.ranks(times - window_ns), graph.ranks(times + window_ns, side="right"),
+    )
+    return pairs.rows[edges[stop > start]]
+
+
+def _three_cycle_rows(graph, window_ns):
+    """
+    Transfers of a -> b -> c -> a where, for some rotation, each transfer
+    is no earlier than the one before and the last is within the window of
+    the first.
+
+    Each cycle is found from the two transfers x -> v -> y around its
+    account v of lowest degree, closed by y -> x. Hubs are therefore never
+    the middle of a searched path unless all three accounts are hubs,
+    which keeps the path count far below in-degree x out-degree.
+    """
+    inc, out, pairs = graph.incoming, graph.outgoing, graph.pairs
+    degree = np.diff(inc.indptr) + np.diff(out.indptr)
+    rank = np.empty(graph.n_accounts, dtype=np.int64)
+    rank[np.lexsort((np.arange(graph.n_accounts), degree))] = np.arange(graph.n_accounts)
+
+    # x -> v into a lower-ranked v, then every v -> y within the window either way
+    first = np.flatnonzero(rank[inc.nodes] < rank[inc.neighbors])
+    first_times = inc.times[first]
+    start, stop = out.between(
+        inc.nodes[first], graph.ranks(first_times - window_ns), graph.ranks(first_times + window_ns, side="right"),
+    )
+
+    rows = []
+    closing = np.zeros(len(pairs.nodes) + 1, dtype=np.int64)
+    for part in _chunks(stop - start, MAX_PATHS):
+        owner, second = _expand(start[part], stop[part])
+        edge = first[part][owner]
+        x, v, y = inc.neighbors[edge], inc.nodes[edge], out.neighbors[second]
+        keep = (rank[y] > rank[v]) & (y != x)
+        edge, second, x, y = edge[keep], second[keep], x[keep], y[keep]
+        t1, t2 = inc.times[edge], out.times[second]
+
+        # y -> x closes the cycle at t3 when, with t1 <= t2, it comes after
+        # both (t3 in [t2, t1 + window]) or before both (t3 in [t2 - window, t1]);
+        # with t2 < t1 it has to fall in between (t3 in [t2, t1])
+        forward = t1 <= t2
+        before_start, before_stop = _pair_edges(graph, y, x, np.where(forward, t2 - window_ns, t2), t1)
+        after_start, after_stop = _pair_edges(graph, y, x, t2, t1 + window_ns)
+        after_stop = np.where(forward, after_stop, after_start)
+
+        hit = (before_stop > before_start) | (after_stop > after_start)
+        rows += [inc.rows[edge[hit]], out.rows[second[hit]]]
+        for bound, sign in ((before_start, 1), (before_stop, -1), (after_start, 1), (after_stop, -1)):
+            closing += sign * np.bincount(bound, minlength=len(closing))
+
+    rows.append(pairs.rows[np.cumsum(closing[:-1]) > 0])
+    return np.concatenate(rows)
+
+
+def cycle_row_ids(graph, window_minutes, max_length=3):
+    """
+    Rows that are a transfer of a cycle a -> b (-> c) -> a of at most
+    `max_length` distinct accounts, with every transfer no earlier than the
+    previous one and the last within `window_minutes` of the first.
+    """
+    if max_length not in (2, 3):
+        raise ValueError("cycles of 2 or 3 transfers are supported")
+    window_ns = int(window_minutes * NS_PER_MINUTE)
+
+    rows = [_two_cycle_rows(graph, window_ns)]
+    if max_length == 3:
+        rows.append(_three_cycle_rows(graph, window_ns))
+    return np.unique(np.concatenate(rows))
+
+
+def graph_columns(rule):
+    return ["sender_account", "receiver_account", "transaction_time"]
+
+
+def graph_window_columns(rule):
+    """fan_out follows the sender, fan_in the receiver, cycles both"""
+    sides = {"fan_out": ["sender_account"], "fan_in": ["receiver_account"]}
+    return [map_field(side) for side in sides.get(rule.get("graph"), ["sender_account", "receiver_account"])]
+
+
+def graph_rows(rule, ctx):
+    """fan_out / fan_in / cycle rules over sender -> receiver transfers"""
+    logger.debug("🔎 Executing Rule %s (Graph Rule)", rule.get("rule_id"))
+    pattern = rule.get("graph")
+    if pattern not in GRAPH_RULES:
+        logger.warning("⚠️ Skipping rule %s - unsupported graph pattern %s", rule.get("rule_id"), pattern)
+        return None
+
+    sender, receiver, time = map_field("sender_account"), map_field("receiver_account"), map_field("transaction_time")
+    for f in [sender, receiver, time]:
+        if f not in ctx.df.columns:
+            logger.warning("⚠️ Skipping Rule %s because field '%s' is missing in dataset", rule.get("rule_id"), f)
+            return None
+
+    window = rule.get("time_window_minutes")
+    if pattern == "cycle" and window is None:
+        logger.warning("⚠️ Skipping rule %s - cycle rules need time_window_minutes", rule.get("rule_id"))
+        return None
+    if pattern != "cycle" and rule.get("counterparty_threshold") is None:
+        logger.warning("⚠️ Skipping rule %s - fan rules need counterparty_threshold", rule.get("rule_id"))
+        return None
+
+    graph = ctx.account_graph(sender, receiver, time)
+    try:
+        if pattern == "cycle":
+            row_ids = cycle_row_ids(graph, window, rule.get("max_cycle_length") or 3)
+        else:
+            adjacency = graph.outgoing if pattern == "fan_out" else graph.incoming
+            row_ids = fan_row_ids(adjacency, rule["counterparty_threshold"], window)
+    except ValueError as e:
+        logger.warning("⚠️ Skipping rule %s - %s", rule.get("rule_id"), e)
+        return None
+    return row_ids
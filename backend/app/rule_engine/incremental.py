@@ -0,0 +1,191 @@
+# rule_engine/incremental.py
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .context import ExecutionContext
+from .executors import window_group_columns
+from .fields import map_field
+from .instrumentation import span
+from .interpreter import compile_policy, mark_rows, pack_rule_mask, violation_frame
+from .windows import NS_PER_MINUTE, build_group_time_index, frequency_row_ids, timestamps_ns
+
+logger = logging.getLogger(__name__)
+
+NAT = np.iinfo(np.int64).min
+
+
+def check_incremental(plan):
+    """
+    Raise ValueError unless every rule of the plan can run batch by batch.
+    Only plain frequency rules keep a window tail; other rules that look
+    across rows (windows, the transfer graph) would only see each batch.
+    """
+    windowed = [step.rule_id for step in plan.steps if step.kind != "frequency" and window_group_columns(step.rule)]
+    if windowed:
+        raise ValueError(f"Rules {', '.join(windowed)} read other rows than the new batch and need a full scan")
+
+
+class WindowTail:
+    """
+    Recent transactions kept between batches for frequency rules: every
+    valid row newer than `watermark - 2 * max_window`, in row order, plus
+    which frequency rules already flagged it.
+    """
+
+    def __init__(self, rule_ids):
+        self.row_ids = np.zeros(0, dtype=np.int64)
+        self.accounts = np.zeros(0, dtype=object)
+        self.times = np.zeros(0, dtype=np.int64)
+        self.flagged = {rule_id: np.zeros(0, dtype=bool) for rule_id in rule_ids}
+        self.watermark = None
+
+    def __len__(self):
+        return len(self.row_ids)
+
+
+class IncrementalState:
+    """
+    Carries policy state across calls to execute_policy over an append-only
+    transaction history, so each call costs O(new rows + window tail).
+
+    Threshold and payment-method rules only look at the new rows. Frequency
+    rules re-count the new rows together with the retained window tail, so
+    the union of all incremental results equals a full rescan. Rows may
+    arrive out of order by up to the largest frequency window; anything
+    older than that raises, since the history it depends on was dropped.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, rules=None):
+        self.rules_key = None if rules is None else self._rules_key(rules)
+        self.rows_seen = 0
+        self.tail = None
+
+    def run(self, rules, df):
+        # Different rules or a shorter (replaced) dataset: start over.
+        if self._rules_key(rules) != self.rules_key or len(df) < self.rows_seen:
+            self.reset(rules)
+
+        offset = self.rows_seen
+        with span("execute_incremental") as s:
+            plan, row_ids, rule_mask = self.evaluate(rules, df.iloc[offset:], offset)
+            violations = violation_frame(plan, df, row_ids, rule_mask)
+            s.add(rows_scanned=len(df) - offset, rows_flagged=len(violations))
+
+        logger.info("📌 Newly flagged transactions: %d (of %d new rows)", len(violations), len(df) - offset)
+        return violations
+
+    @staticmethod
+    def _rules_key(rules):
+        return json.dumps(rules, sort_keys=True, default=str)
+
+    def evaluate(self, rules, batch, offset):
+        """
+        Evaluate the next batch of rows, which start at row position `offset`.
+        Returns (plan, row_ids, rule_mask) sorted by row id. Row ids below
+        `offset` are earlier tail rows that this batch pushed over a
+        frequency threshold, carrying just the newly fired bits.
+        """
+        if self.rules_key is None:
+            self.rules_key = self._rules_key(rules)
+
+        plan = compile_policy(rules)
+        check_incremental(plan)
+
+        ctx = ExecutionContext(batch)
+        frequency_steps = [step for step in plan.steps if step.kind == "frequency" and self._window_ns(step)]
+        if self.tail is None:
+            self.tail = WindowTail([step.rule_id for step in frequency_steps])
+
+        tail_ids = self.tail.row_ids
+        bitmap = np.zeros((len(plan.steps), len(batch)), dtype=bool)
+        tail_bitmap = np.zeros((len(plan.steps), len(tail_ids)), dtype=bool)
+
+        for i, step in enumerate(plan.steps):
+            if any(step is other for other in frequency_steps):
+                continue
+            mark_rows(bitmap[i], step.evaluate(step.rule, ctx))
+
+        if frequency_steps:
+            self._run_frequency(plan, frequency_steps, batch, offset, bitmap, tail_bitmap)
+
+        batch_cols = np.flatnonzero(bitmap.any(axis=0))
+        tail_cols = np.flatnonzero(tail_bitmap.any(axis=0))
+        row_ids = np.concatenate([tail_ids[tail_cols], offset + batch_cols])
+        rule_mask = np.concatenate([
+            pack_rule_mask(plan, tail_bitmap, tail_cols),
+            pack_rule_mask(plan, bitmap, batch_cols),
+        ])
+        order = np.argsort(row_ids, kind="stable")
+
+        self.rows_seen = offset + len(batch)
+        return plan, row_ids[order], rule_mask[order]
+
+    @staticmethod
+    def _window_ns(step):
+        rule = step.rule
+        if rule.get("time_window_minutes") is None or rule.get("transaction_count_threshold") is None:
+            return None
+        return int(rule["time_window_minutes"] * NS_PER_MINUTE)
+
+    def _run_frequency(self, plan, steps, batch, offset, bitmap, tail_bitmap):
+        tail = self.tail
+
+        account_field = map_field("account_id")
+        time_field = map_field("transaction_time")
+        if account_field not in batch.columns or time_field not in batch.columns:
+            logger.warning("⚠️ Skipping frequency rules because '%s' or '%s' is missing in dataset", account_field, time_field)
+            return
+
+        accounts = batch[account_field].to_numpy(dtype=object)
+        times = timestamps_ns(batch[time_field])
+        valid = np.flatnonzero(pd.notna(accounts) & (times != NAT))
+
+        max_window = max(self._window_ns(step) for step in steps)
+        if tail.watermark is not None and len(valid):
+            oldest = times[valid].min()
+            if oldest < tail.watermark - max_window:
+                raise ValueError(
+                    "Appended rows are older than the retained frequency window; "
+                    "run a full rescan instead"
+                )
+
+        # Tail rows first: they precede every new row in row order, which is
+        # how ties on equal timestamps are broken in a full scan.
+        all_ids = np.concatenate([tail.row_ids, offset + valid])
+        all_accounts = np.concatenate([tail.accounts, accounts[valid]])
+        all_times = np.concatenate([tail.times, times[valid]])
+        codes, _ = pd.factorize(all_accounts)
+        index = build_group_time_index(codes.astype(np.int64), all_times)
+
+        n_tail = len(tail)
+        flagged = {}
+        for step in steps:
+            i = next(i for i, other in enumerate(plan.steps) if other is step)
+
+            hits = np.zeros(len(all_ids), dtype=bool)
+            hits[frequency_row_ids(index, step.rule["time_window_minutes"], step.rule["transaction_count_threshold"])] = True
+
+            tail_new = hits[:n_tail] & ~tail.flagged[step.rule_id]
+            tail_bitmap[i] = tail_new
+            bitmap[i, valid] = hits[n_tail:]
+            flagged[step.rule_id] = hits
+            logger.debug("🚩 Rule %s flagged %d rows (incremental)", step.rule_id, int(tail_new.sum() + hits[n_tail:].sum()))
+
+        # Slide the tail forward.
+        if not len(all_times):
+            return
+        watermark = all_times.max()
+        keep = np.flatnonzero(all_times > watermark - 2 * max_window)
+        tail.row_ids = all_ids[keep]
+        tail.accounts = all_accounts[keep]
+        tail.times = all_times[keep]
+        tail.watermark = watermark
+        for rule_id, hits in flagged.items():
+            previous = np.concatenate([tail.flagged[rule_id], np.zeros(len(valid), dtype=bool)])
+            tail.flagged[rule_id] = (hits | previous)[keep]
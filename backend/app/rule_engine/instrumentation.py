@@ -0,0 +1,227 @@
+# rule_engine/instrumentation.py
+"""
+Hot-path instrumentation for the rule engine.
+
+Code wraps a stage in `span(name, **labels)` and may attach counts with
+`s.add(rows_scanned=..., rows_flagged=...)`. Each finished span adds to
+Prometheus-style series keyed by (span name, labels): a wall-time
+histogram and counters for rows scanned, rows flagged and bytes
+allocated. With RULE_ENGINE_TRACE=1 finished spans are also kept in a
+ring buffer (with parent links) for inspection.
+
+RULE_ENGINE_METRICS=0 turns everything off: `span()` then hands out one
+shared no-op object, so an instrumented call costs a function call.
+"""
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pyarrow as pa
+
+SECONDS_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60]
+MAX_TRACE_SPANS = 2048
+
+COUNTERS = {
+    "rows_scanned": "Rows read by the stage",
+    "rows_flagged": "Rows flagged by the stage",
+    "bytes_allocated": "Arrow (and, under tracemalloc, Python) bytes allocated during the stage",
+}
+
+
+def _allocated_bytes():
+    """Cheap allocation counter; Python heap only counts while tracemalloc runs"""
+    allocated = pa.total_allocated_bytes()
+    if tracemalloc.is_tracing():
+        allocated += tracemalloc.get_traced_memory()[0]
+    return allocated
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("owner", "name", "labels", "counts", "span_id", "parent_id", "started", "seconds", "_bytes")
+
+    def __init__(self, owner, name, labels):
+        self.owner = owner
+        self.name = name
+        self.labels = labels
+        self.counts = {}
+        self.span_id = None
+        self.parent_id = None
+        self.seconds = None
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.owner._push(self)
+        self._bytes = _allocated_bytes()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        allocated = _allocated_bytes() - self._bytes
+        if allocated > 0:
+            self.add(bytes_allocated=allocated)
+        self.owner._pop(self, failed=exc[0] is not None)
+        return False
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative bucket counts, Prometheus style)"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if value is None:
+            return
+        with self._lock:
+            i = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            self.counts[i] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+                running += count
+                cumulative[str(bound)] = running
+            return {"buckets": cumulative, "sum": self.total, "count": self.count}
+
+
+def _label_text(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Instrumentation:
+    """Span-based metrics (and optional trace) registry for one process"""
+
+    def __init__(self, enabled=True, trace=False, prefix="rule_engine"):
+        self.enabled = enabled
+        self.trace = trace
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._seconds = {}
+            self._failures = {}
+            self._counters = {name: {} for name in COUNTERS}
+            self._spans = deque(maxlen=MAX_TRACE_SPANS)
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, labels)
+
+    def _push(self, span):
+        if self.trace:
+            stack = self._local.__dict__.setdefault("stack", [])
+            span.span_id = next(self._ids)
+            span.parent_id = stack[-1].span_id if stack else None
+            stack.append(span)
+
+    def _pop(self, span, failed):
+        if self.trace:
+            self._local.stack.pop()
+
+        key = (span.name, tuple(sorted(span.labels.items())))
+        with self._lock:
+            histogram = self._seconds.get(key)
+            if histogram is None:
+                histogram = self._seconds[key] = Histogram(SECONDS_BUCKETS)
+            histogram.observe(span.seconds)
+            if failed:
+                self._failures[key] = self._failures.get(key, 0) + 1
+            for counter, value in span.counts.items():
+                series = self._counters.setdefault(counter, {})
+                series[key] = series.get(key, 0) + value
+            if self.trace:
+                self._spans.append({
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "labels": span.labels,
+                    "thread": threading.current_thread().name,
+                    "start": time.time() - span.seconds,
+                    "seconds": span.seconds,
+                    "failed": failed,
+                    **span.counts,
+                })
+
+    def spans(self):
+        """Finished trace spans, oldest first (empty unless tracing is on)"""
+        with self._lock:
+            return list(self._spans)
+
+    def render_prometheus(self):
+        """All series in the Prometheus text exposition format"""
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_span_seconds Wall time per stage or rule",
+            f"# TYPE {p}_span_seconds histogram",
+        ]
+        with self._lock:
+            for (name, labels), h in sorted(self._seconds.items()):
+                base = (("span", name),) + labels
+                snapshot = h.snapshot()
+                for bound, running in snapshot["buckets"].items():
+                    lines.append(f"{p}_span_seconds_bucket{_label_text(base, ('le', bound))} {running}")
+                lines.append(f"{p}_span_seconds_sum{_label_text(base)} {snapshot['sum']}")
+                lines.append(f"{p}_span_seconds_count{_label_text(base)} {snapshot['count']}")
+
+            lines += [f"# HELP {p}_span_failures_total Spans that ended with an exception", f"# TYPE {p}_span_failures_total counter"]
+            for (name, labels), value in sorted(self._failures.items()):
+                lines.append(f"{p}_span_failures_total{_label_text((('span', name),) + labels)} {value}")
+
+            for counter, series in self._counters.items():
+                help_text = COUNTERS.get(counter, counter)
+                lines += [f"# HELP {p}_{counter}_total {help_text}", f"# TYPE {p}_{counter}_total counter"]
+                for (name, labels), value in sorted(series.items()):
+                    lines.append(f"{p}_{counter}_total{_label_text((('span', name),) + labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off", "")
+
+
+instrumentation = Instrumentation(
+    enabled=_env_flag("RULE_ENGINE_METRICS", "1"),
+    trace=_env_flag("RULE_ENGINE_TRACE", "0"),
+)
+
+
+def span(name, **labels):
+    """Instrumented block on the process-wide registry"""
+    return instrumentation.span(name, **labels)
@@ -1,158 +1,171 @@
 import json
-import pandas as pd
-import operator
-
-OPERATOR_MAP = {
-    ">": operator.gt,
-    ">=": operator.ge,
-    "<": operator.lt,
-    "<=": operator.le,
-    "==": operator.eq,
-    "!=": operator.ne,
-}
-
-# Field mapping from logical names in rules → actual CSV columns
-FIELD_MAP = {
-    "transaction_time": "Timestamp",
-    "amount": "Amount Paid",           # use Amount Received if needed
-    "sender_bank_field": "From Bank",
-    "receiver_bank_field": "To Bank",
-    "account_id": "From Account",      # or To Account depending on use case
-    "payment_method": "Payment Format",
-    "field":""
-
-}
-
-def map_field(field):
-    """Map rule field to actual CSV column, return None if missing"""
-    if field in FIELD_MAP:
-        return FIELD_MAP[field] or None
-    return field if field else None
-
-def apply_threshold_rule(rule, df):
-    print(f"\n🔎 Executing Rule {rule.get('rule_id', 'Unknown')} (Threshold Rule)")
-
-    # map field and skip if None
-    field = map_field(rule.get("field"))
-    if not field or field not in df.columns:
-        print(f"⚠️ Skipping rule {rule.get('rule_id')} - field is missing or None")
-        return pd.DataFrame()  # empty, so it won't append
-
-    operator_symbol = rule.get("operator")
-    threshold = rule.get("threshold")
-
-    op_func = OPERATOR_MAP.get(operator_symbol)
-    if operator_symbol is not None and not op_func:
-        print(f"⚠️ Skipping rule {rule.get('rule_id')} - unsupported operator {operator_symbol}")
-        return pd.DataFrame()
-
-    mask = op_func(df[field], threshold)
-    flagged = df[mask].copy()
-    flagged["triggered_rule"] = rule.get("rule_id", "Unknown")
-
-    print("🚩 Violations found:", len(flagged))
-    return flagged
-
-# def apply_cross_bank_rule(rule, df):
-#     print(f"\n🔎 Executing Rule {rule['rule_id']} (Cross-Bank Rule)")
-
-#     # Map rule fields → actual CSV columns
-#     sender_field = map_field(rule["sender_bank_field"])
-#     receiver_field = map_field(rule["receiver_bank_field"])
-
-#     if sender_field not in df.columns or receiver_field not in df.columns:
-#         raise ValueError(f"❌ Sender ({sender_field}) or receiver ({receiver_field}) bank field missing")
-
-#     mask = df[sender_field] != df[receiver_field]
-
-#     flagged = df[mask].copy()
-#     flagged["triggered_rule"] = rule["rule_id"]
-
-#     print("🚩 Cross-bank transactions:", len(flagged))
-#     return flagged
-
-def apply_frequency_rule(rule, df):
-    # Check for required fields in rule
-    required_rule_fields = ["time_window_minutes", "transaction_count_threshold"]
-    if any(rule.get(f) is None for f in required_rule_fields):
-        print(f"⚠️ Skipping Rule {rule.get('rule_id')} due to missing rule parameters")
-        return pd.DataFrame()
-
-    print(f"\n🔎 Executing Rule {rule['rule_id']} (Frequency Rule)")
-    time_window = rule["time_window_minutes"]
-    txn_threshold = rule["transaction_count_threshold"]
-
-    account_field = map_field("account_id")
-    txn_amount_field = map_field("amount")
-    time_field = map_field("transaction_time")
-
-    # Check that these fields exist in the dataframe
-    for f in [account_field, txn_amount_field, time_field]:
-        if f not in df.columns:
-            print(f"⚠️ Skipping Rule {rule.get('rule_id')} because field '{f}' is missing in dataset")
-            return pd.DataFrame()
-
-    # Convert timestamp column to datetime, drop invalid timestamps
-    df_sorted = df.copy()
-    df_sorted[time_field] = pd.to_datetime(df_sorted[time_field], errors='coerce')
-    df_sorted = df_sorted.dropna(subset=[time_field])
-
-    df_sorted = df_sorted.sort_values(time_field)
-    flagged_indices = []
-
-    # Group by account
-    for account, group in df_sorted.groupby(account_field):
-        group = group.set_index(time_field)
-        rolling_counts = group[txn_amount_field].rolling(f"{time_window}min").count()
-        suspicious = rolling_counts > txn_threshold
-        flagged_indices.extend(group[suspicious].index)
-
-    flagged = df_sorted[df_sorted[time_field].isin(flagged_indices)].copy()
-    flagged["triggered_rule"] = rule["rule_id"]
-
-    print("🚩 High-frequency violations:", len(flagged))
-    return flagged
-
-def apply_payment_method_rule(rule, df):
-    print(f"\n🔎 Executing Rule {rule['rule_id']} (Payment Method Rule)")
-    methods = rule["payment_methods"]
-    threshold = rule.get("threshold", 0)
+import logging
+import time
+from dataclasses import dataclass, field
 
-    payment_field = map_field("payment_method")
-    amount_field = map_field("amount")
-
-    if payment_field not in df.columns:
-        raise ValueError(f"❌ {payment_field} column missing")
-
-    mask = df[payment_field].isin(methods) & (df[amount_field] > threshold)
-    flagged = df[mask].copy()
-    flagged["triggered_rule"] = rule["rule_id"]
+import numpy as np
+import pandas as pd
 
-    print("🚩 High-risk payment violations:", len(flagged))
-    return flagged
+from .context import ExecutionContext
+from .executors import executor_for, rule_columns
+# Re-exported for callers that import them from the interpreter
+from .executors import compare_columns, rule_kind, window_group_columns
+from .fields import FIELD_MAP, OPERATOR_MAP, map_field
+from .instrumentation import instrumentation, span
 
-def execute_policy(rules, df):
-    print("\n🚀 Starting policy execution...\n")
-    all_violations = []
+logger = logging.getLogger(__name__)
 
+def required_columns(rules):
+    """Dataset columns the given rules read, used for column projection"""
+    columns = []
     for rule in rules:
-        # Decide rule type based on JSON structure
-        if rule.get("time_window_minutes") is not None:
-            result = apply_frequency_rule(rule, df)
-        # elif rule.get("sender_bank_field") is not None:
-            # result = apply_cross_bank_rule(rule, df)
-        elif rule.get("payment_methods"):
-            result = apply_payment_method_rule(rule, df)
-        else:
-            result = apply_threshold_rule(rule, df)
-
-        if not result.empty:
-            all_violations.append(result)
-
-    if not all_violations:
-        print("✅ No violations found.")
-        return pd.DataFrame()
-
-    combined = pd.concat(all_violations, ignore_index=True)
-    print("\n📌 Total violations across all rules:", len(combined))
-    return combined
\ No newline at end of file
+        for column in rule_columns(rule):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+# rule_mask bit i is set when plan step i flagged the row
+MAX_PLAN_RULES = 64
+
+@dataclass
+class PlanStep:
+    rule_id: str
+    kind: str
+    rule: dict
+    evaluate: object
+    columns: list = field(default_factory=list)
+
+@dataclass
+class PolicyPlan:
+    steps: list = field(default_factory=list)
+
+    @property
+    def rule_ids(self):
+        return [step.rule_id for step in self.steps]
+
+    @property
+    def columns(self):
+        """Dataset columns the plan reads; nothing else needs loading"""
+        columns = []
+        for step in self.steps:
+            columns += [col for col in step.columns if col not in columns]
+        return columns
+
+    @property
+    def mask_dtype(self):
+        for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+            if len(self.steps) <= np.iinfo(dtype).bits:
+                return dtype
+        raise ValueError(f"Policy has {len(self.steps)} rules; at most {MAX_PLAN_RULES} are supported")
+
+def compile_policy(rules):
+    """
+    Turn a rule list into an execution plan (one step per rule, in order).
+    ValueError for too many rules or a rule_type without an executor.
+    """
+    if len(rules) > MAX_PLAN_RULES:
+        raise ValueError(f"Policy has {len(rules)} rules; at most {MAX_PLAN_RULES} are supported")
+
+    plan = PolicyPlan()
+    for position, rule in enumerate(rules):
+        executor = executor_for(rule)
+        plan.steps.append(PlanStep(
+            rule_id=str(rule.get("rule_id") or f"rule_{position}"),
+            kind=executor.rule_type,
+            rule=rule,
+            evaluate=executor.evaluate,
+            columns=rule_columns(rule),
+        ))
+    return plan
+
+def mark_rows(flags, result):
+    """Set an executor's result (boolean mask or row positions) in a bitmap row"""
+    if result is None:
+        return
+    if result.dtype == bool:
+        flags[:] = result
+    else:
+        flags[result] = True
+
+def evaluate_plan(plan, ctx, progress=None):
+    """
+    Evaluate every step into one (rules x rows) boolean bitmap. Executors
+    return either a boolean mask or flagged row positions.
+    `progress(step, flagged, seconds)` is called after each step.
+    """
+    rows = len(ctx.df)
+    bitmap = np.zeros((len(plan.steps), rows), dtype=bool)
+    for i, step in enumerate(plan.steps):
+        started = time.perf_counter()
+        with span("rule", rule_id=step.rule_id, kind=step.kind) as s:
+            mark_rows(bitmap[i], step.evaluate(step.rule, ctx))
+            if progress is None and not instrumentation.enabled:
+                continue
+            flagged = int(np.count_nonzero(bitmap[i]))
+            s.add(rows_scanned=rows, rows_flagged=flagged)
+        logger.debug("🚩 Rule %s flagged %d rows", step.rule_id, flagged)
+        if progress is not None:
+            progress(step, flagged, time.perf_counter() - started)
+    return bitmap
+
+def build_violations(plan, df, bitmap):
+    """
+    Build the violation frame once from the bitmap: one row per flagged
+    transaction, indexed by its original row position, with a `rule_mask`
+    column holding the bits of every rule that fired on it.
+    """
+    row_ids = np.flatnonzero(bitmap.any(axis=0))
+    return violation_frame(plan, df, row_ids, pack_rule_mask(plan, bitmap, row_ids))
+
+def pack_rule_mask(plan, bitmap, columns):
+    """Pack the bitmap columns at `columns` into one integer rule mask each"""
+    dtype = plan.mask_dtype
+    rule_mask = np.zeros(len(columns), dtype=dtype)
+    for i in range(len(plan.steps)):
+        rule_mask |= bitmap[i, columns].astype(dtype) << dtype(i)
+    return rule_mask
+
+def violation_frame(plan, df, row_ids, rule_mask):
+    """Violation frame for explicit row positions in `df` and their rule bits"""
+    violations = df.take(row_ids)
+    violations.index = pd.Index(row_ids, name="row_id")
+    violations["rule_mask"] = rule_mask
+    violations.attrs["rule_ids"] = plan.rule_ids
+    violations.attrs["rule_counts"] = {
+        rule_id: int(np.count_nonzero(rule_mask >> i & 1))
+        for i, rule_id in enumerate(plan.rule_ids)
+    }
+    return violations
+
+def decode_rule_mask(mask, rule_ids):
+    """Rule ids whose bit is set in a `rule_mask` value"""
+    mask = int(mask)
+    return [rule_id for bit, rule_id in enumerate(rule_ids) if mask >> bit & 1]
+
+def execute_policy(rules, df, context=None, state=None, plan=None, progress=None):
+    """
+    Run a policy over `df`. Pass the dataset's cached ExecutionContext to
+    reuse derived columns from earlier runs; otherwise a fresh one is used.
+    A plan already compiled from `rules` (e.g. cached by the rule store)
+    skips compilation; `progress` is passed on to evaluate_plan.
+
+    With an IncrementalState, `df` is treated as the full, append-only
+    history: only rows added since the previous call are evaluated and only
+    their violations are returned.
+    """
+    if state is not None:
+        return state.run(rules, df)
+
+    if context is None or context.df is not df:
+        context = ExecutionContext(df)
+
+    with span("execute_policy") as s:
+        if plan is None:
+            plan = compile_policy(rules)
+        bitmap = evaluate_plan(plan, context, progress)
+        with span("build_violations"):
+            violations = build_violations(plan, df, bitmap)
+        s.add(rows_scanned=len(df), rows_flagged=len(violations))
+
+    logger.info("📌 Total flagged transactions across all rules: %d", len(violations))
+    return violations
@@ -1,7 +1,16 @@
 # rule_engine/loader.py
 import os
+import sys
 import json
+import logging
+import threading
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../../")
@@ -9,22 +18,209 @@ BASE_DIR = os.path.abspath(
 
 DATA_PATH = os.path.join(BASE_DIR, "data", "HI-Small_Trans.csv")
 
+TIME_COLUMN = "Timestamp"
+TIMESTAMP_FORMAT = "%Y/%m/%d %H:%M"
+
+# Explicit dtypes for the AML transaction schema so pandas doesn't have to
+# infer them (and doesn't fall back to object columns). Columns missing from
+# a given file are simply ignored.
+CSV_DTYPES = {
+    "From Bank": "str",
+    "From Account": "str",
+    "To Bank": "str",
+    "To Account": "str",
+    "Amount Received": "float64",
+    "Receiving Currency": "category",
+    "Amount Paid": "float64",
+    "Payment Currency": "category",
+    "Payment Format": "category",
+    "is_laundering": "int8",
+}
+
+LABEL_COLUMN = "is_laundering"
+
+# Column pairs that share a value domain get one categorical dictionary, so
+# their integer codes are directly comparable (e.g. From Bank vs To Bank).
+SHARED_CATEGORY_COLUMNS = [
+    ("From Bank", "To Bank"),
+    ("From Account", "To Account"),
+]
+CATEGORY_COLUMNS = ["Payment Format", "Receiving Currency", "Payment Currency"]
+# Amounts stay float64: thresholds in rules are float64, and comparing them
+# against a float32 column would round the threshold to float32 first.
+AMOUNT_COLUMNS = ["Amount Received", "Amount Paid"]
+
 def load_rules(path="rules/latest_rules.json"):
-    print("📦 Loading rules...")
+    logger.info("📦 Loading rules from %s", path)
     with open(path, "r") as f:
         return json.load(f)
 
-def load_dataset(path=DATA_PATH):
-    print("📊 Loading dataset...")
-    df = pd.read_csv(path)
+def parse_timestamps(series):
+    """Parse a timestamp column, trying the dataset's known format first"""
+    try:
+        return pd.to_datetime(series, format=TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series, errors="coerce")
+
+def is_parquet(path):
+    return str(path).lower().endswith(".parquet")
+
+def parquet_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+def dataset_columns(path):
+    """Column names of a CSV or Parquet dataset without loading any rows"""
+    if is_parquet(path):
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def _project(path, columns):
+    if columns is None:
+        return None
+    available = dataset_columns(path)
+    return [col for col in available if col in set(columns)]
+
+def load_dataset(path=DATA_PATH, columns=None):
+    """
+    Load a transaction dataset from CSV or Parquet.
+
+    If `columns` is given only those columns are read (unknown names are
+    ignored). Parquet files are memory-mapped, so projected reads don't pull
+    the other columns off disk at all.
+    """
+    with span("load_dataset", format="parquet" if is_parquet(path) else "csv") as s:
+        df = _read_dataset(path, columns)
+        s.add(rows_scanned=len(df))
+
+    logger.info("✅ Dataset loaded: %d rows from %s", len(df), path)
+    return df
+
+def _read_dataset(path, columns):
+    usecols = _project(path, columns)
+
+    if is_parquet(path):
+        table = pq.read_table(path, columns=usecols, memory_map=True)
+        return table.to_pandas()
+
+    header = usecols if usecols is not None else dataset_columns(path)
+    dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col in header}
+    df = pd.read_csv(path, dtype=dtypes, usecols=usecols)
+
+    if TIME_COLUMN in df.columns:
+        df[TIME_COLUMN] = parse_timestamps(df[TIME_COLUMN])
 
     if "transaction_time" in df.columns:
         df["transaction_time"] = pd.to_datetime(df["transaction_time"])
 
-    print("✅ Dataset loaded:", len(df), "rows")
     return df
 
+def iter_dataset_chunks(path=DATA_PATH, chunk_rows=500_000, columns=None):
+    """
+    Yield a CSV or Parquet dataset as DataFrames of at most `chunk_rows`
+    rows, each indexed by global row position, without ever holding the
+    whole file in memory.
+    """
+    usecols = _project(path, columns)
+    offset = 0
+
+    if is_parquet(path):
+        parquet = pq.ParquetFile(path, memory_map=True)
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_rows, columns=usecols))
+    else:
+        header = usecols if usecols is not None else dataset_columns(path)
+        dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col in header}
+        chunks = pd.read_csv(path, dtype=dtypes, usecols=usecols, chunksize=chunk_rows)
+
+    for chunk in chunks:
+        if TIME_COLUMN in chunk.columns and not pd.api.types.is_datetime64_any_dtype(chunk[TIME_COLUMN]):
+            chunk[TIME_COLUMN] = parse_timestamps(chunk[TIME_COLUMN])
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+def compact_transactions(df):
+    """Convert a freshly parsed transaction frame to its compact column types"""
+    df = df.copy()
+
+    for group in SHARED_CATEGORY_COLUMNS:
+        present = [col for col in group if col in df.columns]
+        if not present:
+            continue
+        values = pd.concat([df[col].astype("object") for col in present], ignore_index=True)
+        categories = pd.Index(values.dropna().unique()).sort_values()
+        for col in present:
+            df[col] = pd.Categorical(df[col].astype("object"), categories=categories)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    if LABEL_COLUMN in df.columns:
+        df[LABEL_COLUMN] = df[LABEL_COLUMN].astype("int8")
+
+    return df
+
+_conversion_locks = {}
+_conversion_locks_lock = threading.Lock()
+
+def _conversion_lock(parquet_path):
+    """One lock per target file, so concurrent runs convert it only once"""
+    with _conversion_locks_lock:
+        return _conversion_locks.setdefault(os.path.abspath(parquet_path), threading.RLock())
+
+def _parquet_fresh(csv_path, parquet_path):
+    if not os.path.exists(parquet_path):
+        return False
+    if os.path.exists(csv_path) and os.path.getmtime(parquet_path) < os.path.getmtime(csv_path):
+        return False
+    # Earlier conversions stored amounts as float32; those files are redone
+    schema = pq.read_schema(parquet_path)
+    return all(schema.field(col).type == pa.float64() for col in AMOUNT_COLUMNS if col in schema.names)
+
+def convert_csv_to_parquet(csv_path=DATA_PATH, parquet_path=None):
+    """
+    One-off conversion of a transaction CSV to a typed Parquet file:
+    categorical banks/accounts/payment formats, pre-parsed timestamps and
+    float64 amounts. Written to a temp file of its own (pid + thread) and
+    renamed into place, under a per-file lock.
+    """
+    parquet_path = parquet_path or parquet_path_for(csv_path)
+
+    with _conversion_lock(parquet_path):
+        logger.info("🧱 Converting %s → %s", csv_path, parquet_path)
+        with span("convert_parquet") as s:
+            df = compact_transactions(load_dataset(csv_path))
+
+            tmp_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                df.to_parquet(tmp_path, engine="pyarrow", index=False)
+                os.replace(tmp_path, parquet_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            s.add(rows_scanned=len(df))
+    return parquet_path
+
+def ensure_parquet(csv_path=DATA_PATH):
+    """Return an up-to-date Parquet copy of `csv_path`, converting if needed"""
+    if is_parquet(csv_path):
+        return csv_path
+
+    parquet_path = parquet_path_for(csv_path)
+    if _parquet_fresh(csv_path, parquet_path):
+        return parquet_path
+
+    # Another run may have converted it while this one waited for the lock
+    with _conversion_lock(parquet_path):
+        if _parquet_fresh(csv_path, parquet_path):
+            return parquet_path
+        return convert_csv_to_parquet(csv_path, parquet_path)
+
 if __name__ == "__main__":
+    if "--convert" in sys.argv:
+        print("✅ Parquet dataset:", ensure_parquet())
+        sys.exit(0)
+
     print("🔎 Testing loader...")
 
     df = load_dataset()
@@ -32,4 +228,4 @@ if __name__ == "__main__":
 
     # Optional: test rules too
     # rules = load_rules()
-    # print(rules)
\ No newline at end of file
+    # print(rules)
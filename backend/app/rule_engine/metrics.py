@@ -1,33 +1,84 @@
 # rule_engine/metrics.py
+import logging
 
-from sklearn.metrics import precision_score, recall_score, f1_score
 import numpy as np
 
-def compute_metrics(df, violations):
-    print("\n📊 Computing evaluation metrics...")
+from .instrumentation import span
+from .loader import LABEL_COLUMN
+
+logger = logging.getLogger(__name__)
+
+
+def _scores(tp, flagged, positives):
+    precision = tp / flagged if flagged else 0.0
+    recall = tp / positives if positives else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1_score": f1}
+
+
+def metrics_from_row_ids(y_true, row_ids, rule_mask=None, rule_ids=None):
+    """
+    Precision/recall/F1 from the positional row ids of flagged rows.
 
-    if "is_laundering" not in df.columns:
-        raise ValueError("❌ Dataset must contain 'is_laundering' column")
+    `y_true` is the per-row label array; everything else is sized by the
+    number of flagged rows, so no full-length prediction array is built.
+    With `rule_mask`/`rule_ids` the same figures are reported per rule.
+    Duplicate row ids (e.g. from a streaming sink) are merged.
+    """
+    y_true = np.asarray(y_true).astype(bool, copy=False)
+    row_ids = np.asarray(row_ids, dtype=np.int64)
 
-    # Ground truth
-    y_true = df["is_laundering"].values
+    if rule_mask is not None:
+        rule_mask = np.asarray(rule_mask)
+    if len(row_ids) and np.any(row_ids[1:] <= row_ids[:-1]):
+        row_ids, inverse = np.unique(row_ids, return_inverse=True)
+        if rule_mask is not None:
+            merged = np.zeros(len(row_ids), dtype=rule_mask.dtype)
+            np.bitwise_or.at(merged, inverse, rule_mask)
+            rule_mask = merged
 
-    # Build prediction array (same length as dataset)
-    y_pred = np.zeros(len(df))
+    positives = int(np.count_nonzero(y_true))
+    hits = y_true[row_ids]
+    tp = int(np.count_nonzero(hits))
+    fp = len(row_ids) - tp
+    fn = positives - tp
+    tn = len(y_true) - tp - fp - fn
+
+    result = _scores(tp, len(row_ids), positives)
+    result["confusion"] = {"tp": tp, "fp": fp, "fn": fn, "tn": tn}
+
+    if rule_mask is not None and rule_ids is not None:
+        per_rule = {}
+        for bit, rule_id in enumerate(rule_ids):
+            fired = (rule_mask >> bit & 1).astype(bool)
+            flagged = int(np.count_nonzero(fired))
+            rule_tp = int(np.count_nonzero(fired & hits))
+            per_rule[rule_id] = dict(_scores(rule_tp, flagged, positives), flagged=flagged, true_positives=rule_tp)
+        result["per_rule"] = per_rule
+
+    return result
+
+
+def compute_metrics(df, violations):
+    if LABEL_COLUMN not in df.columns:
+        raise ValueError(f"❌ Dataset must contain '{LABEL_COLUMN}' column")
 
-    # Mark flagged rows as predicted suspicious
-    y_pred[violations.index] = 1
+    # violations is indexed by original row position (see build_violations)
+    row_ids = violations.index.to_numpy()
+    rule_mask = violations["rule_mask"].to_numpy() if "rule_mask" in violations.columns else None
 
-    precision = precision_score(y_true, y_pred, zero_division=0)
-    recall = recall_score(y_true, y_pred, zero_division=0)
-    f1 = f1_score(y_true, y_pred, zero_division=0)
+    with span("compute_metrics") as s:
+        metrics = metrics_from_row_ids(
+            df[LABEL_COLUMN].to_numpy(),
+            row_ids,
+            rule_mask=rule_mask,
+            rule_ids=violations.attrs.get("rule_ids"),
+        )
+        s.add(rows_scanned=len(df), rows_flagged=len(row_ids))
 
-    print(f"Precision: {precision:.4f}")
-    print(f"Recall: {recall:.4f}")
-    print(f"F1 Score: {f1:.4f}")
+    logger.info(
+        "📊 Precision: %.4f  Recall: %.4f  F1 Score: %.4f",
+        metrics["precision"], metrics["recall"], metrics["f1_score"],
+    )
 
-    return {
-        "precision": precision,
-        "recall": recall,
-        "f1_score": f1
-    }
\ No newline at end of file
+    return metrics
@@ -0,0 +1,161 @@
+# rule_engine/parallel.py
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .context import ExecutionContext
+from .executors import window_group_columns
+from .fields import map_field
+from .instrumentation import span
+from .interpreter import (
+    compile_policy,
+    evaluate_plan,
+    execute_policy,
+    pack_rule_mask,
+    required_columns,
+    violation_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+ROW_ID_COLUMN = "__row_id"
+
+# Partitions are written as uncompressed Arrow IPC files that workers
+# memory-map, so on Linux they live in shared memory rather than on disk.
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def process_context():
+    """
+    Start method for worker processes. Not fork: the server runs job, LLM
+    and I/O threads, and a fork can copy a lock one of them holds into the
+    child, where nothing will ever release it. Executors registered at
+    runtime must live in a module the workers import.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def configured_workers():
+    """Worker count from RULE_ENGINE_WORKERS (default: 1, i.e. serial)"""
+    try:
+        return max(1, int(os.getenv("RULE_ENGINE_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def _pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+        return pool
+
+
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+def partition_by_account(df, partitions):
+    """
+    Row positions of each partition, hashing the account column so every
+    account's transactions land in exactly one partition (which keeps
+    frequency windows intact). Positions stay in row order.
+    """
+    account_field = map_field("account_id")
+    if account_field in df.columns:
+        hashes = pd.util.hash_pandas_object(df[account_field].astype("object"), index=False).to_numpy()
+        assignment = hashes % np.uint64(partitions)
+    else:
+        assignment = np.arange(len(df)) % partitions
+
+    order = np.argsort(assignment, kind="stable")
+    bounds = np.searchsorted(assignment[order], np.arange(partitions + 1))
+    return [order[bounds[p]:bounds[p + 1]] for p in range(partitions)]
+
+
+def _write_partition(table, row_ids, path):
+    part = table.take(pa.array(row_ids)).append_column(ROW_ID_COLUMN, pa.array(row_ids, type=pa.int64()))
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, part.schema) as writer:
+            writer.write_table(part)
+
+
+def _evaluate_partition(path, rules):
+    """Worker: run the compiled policy on one memory-mapped partition"""
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    row_ids = table.column(ROW_ID_COLUMN).to_numpy()
+    df = table.drop_columns([ROW_ID_COLUMN]).to_pandas()
+
+    plan = compile_policy(rules)
+    bitmap = evaluate_plan(plan, ExecutionContext(df))
+    cols = np.flatnonzero(bitmap.any(axis=0))
+    return row_ids[cols], pack_rule_mask(plan, bitmap, cols)
+
+
+def execute_policy_parallel(rules, df, workers=None):
+    """
+    Same result as execute_policy, computed across a process pool.
+
+    The frame is hash-partitioned by account, each partition is handed to a
+    worker as a memory-mapped Arrow file holding only the columns the rules
+    read, and workers send back just (row ids, rule masks). Results are
+    merged in row order, so the output doesn't depend on scheduling.
+    """
+    workers = workers or configured_workers()
+    plan = compile_policy(rules)
+
+    # Windows grouped by anything but the account (e.g. counterparty) would
+    # be split across partitions
+    account_field = map_field("account_id")
+    if any(col != account_field for step in plan.steps for col in window_group_columns(step.rule)):
+        logger.info("📌 Policy has windows not grouped by account, running serially")
+        return execute_policy(rules, df, plan=plan)
+
+    with span("execute_parallel") as s:
+        violations = _execute_partitioned(plan, rules, df, workers)
+        s.add(rows_scanned=len(df), rows_flagged=len(violations))
+
+    logger.info("📌 Total flagged transactions across all rules: %d (%d workers)", len(violations), workers)
+    return violations
+
+
+def _execute_partitioned(plan, rules, df, workers):
+    columns = [col for col in required_columns(rules) if col in df.columns]
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    partitions = [rows for rows in partition_by_account(df, workers) if len(rows)]
+
+    tmp_dir = tempfile.mkdtemp(prefix="rule-partitions-", dir=SHARED_DIR)
+    try:
+        paths = []
+        for p, rows in enumerate(partitions):
+            path = os.path.join(tmp_dir, f"part-{p}.arrow")
+            _write_partition(table, rows, path)
+            paths.append(path)
+
+        pool = _pool(workers)
+        results = list(pool.map(_evaluate_partition, paths, [rules] * len(paths)))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    dtype = plan.mask_dtype
+    row_ids = np.concatenate([ids for ids, _ in results] or [np.zeros(0, dtype=np.int64)])
+    rule_mask = np.concatenate([mask.astype(dtype) for _, mask in results] or [np.zeros(0, dtype=dtype)])
+    order = np.argsort(row_ids, kind="stable")
+
+    return violation_frame(plan, df, row_ids[order], rule_mask[order])
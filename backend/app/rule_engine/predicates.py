@@ -0,0 +1,282 @@
+# rule_engine/predicates.py
+"""
+Compound rules: a `condition` tree of AND ("all") and OR ("any") nodes
+over leaf predicates, e.g. "Wire above 10k to another bank, from an
+account with more than 3 transfers within 1 hour":
+
+    {"all": [
+        {"field": "payment_method", "operator": "==", "value": "Wire"},
+        {"field": "amount", "operator": ">", "value": 10000},
+        {"field": "sender_bank", "operator": "!=", "compare_field": "receiver_bank"},
+        {"time_window_minutes": 60, "transaction_count_threshold": 3}
+    ]}
+
+Leaves are a comparison with a value, `in`/`not_in` a list of values, a
+comparison with another column (`compare_field`), or a frequency window.
+
+Every node is evaluated on a subset of rows. An AND runs its terms from
+the most to the least selective, each on the rows that passed the terms
+before it; an OR runs the most inclusive term first and later terms only
+on rows that haven't matched yet. Selectivity is measured on a fixed
+sample of rows, so a compound rule costs about as much as its most
+selective term plus work proportional to the survivors.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .fields import OPERATOR_MAP, map_field
+from .windows import frequency_row_ids
+
+logger = logging.getLogger(__name__)
+
+# Rows used to estimate how selective each term is
+SAMPLE_ROWS = 2048
+
+SET_OPERATORS = ("in", "not_in")
+
+
+def _take(values, rows):
+    return values if rows is None else values[rows]
+
+
+def _sample_rows(ctx):
+    n = len(ctx.df)
+    return ctx.memo(
+        ("sample_rows", SAMPLE_ROWS),
+        lambda: np.unique(np.linspace(0, max(n - 1, 0), min(n, SAMPLE_ROWS)).astype(np.int64)),
+    )
+
+
+class Node:
+    def selectivity(self, ctx):
+        """Fraction of sampled rows that match"""
+        sample = _sample_rows(ctx)
+        if not len(sample):
+            return 0.0
+        return float(np.count_nonzero(self.evaluate(ctx, sample))) / len(sample)
+
+
+class AllOf(Node):
+    def __init__(self, terms):
+        self.terms = terms
+
+    def columns(self):
+        return [col for term in self.terms for col in term.columns()]
+
+    def evaluate(self, ctx, rows=None):
+        n = len(ctx.df) if rows is None else len(rows)
+        alive = None
+        for term in sorted(self.terms, key=lambda term: term.selectivity(ctx)):
+            if alive is None:
+                alive = np.flatnonzero(term.evaluate(ctx, rows))
+            else:
+                alive = alive[term.evaluate(ctx, alive if rows is None else rows[alive])]
+            if not len(alive):
+                break
+        result = np.zeros(n, dtype=bool)
+        result[alive] = True
+        return result
+
+
+class AnyOf(Node):
+    def __init__(self, terms):
+        self.terms = terms
+
+    def columns(self):
+        return [col for term in self.terms for col in term.columns()]
+
+    def evaluate(self, ctx, rows=None):
+        n = len(ctx.df) if rows is None else len(rows)
+        result = np.zeros(n, dtype=bool)
+        pending = None
+        for term in sorted(self.terms, key=lambda term: term.selectivity(ctx), reverse=True):
+            if pending is None:
+                result |= term.evaluate(ctx, rows)
+                pending = np.flatnonzero(~result)
+            else:
+                hit = term.evaluate(ctx, pending if rows is None else rows[pending])
+                result[pending[hit]] = True
+                pending = pending[~hit]
+            if not len(pending):
+                break
+        return result
+
+
+class Leaf(Node):
+    def __init__(self, spec):
+        self.spec = spec
+        self.operator = spec.get("operator")
+
+        if spec.get("time_window_minutes") is not None:
+            if spec.get("transaction_count_threshold") is None:
+                raise ValueError("frequency condition needs transaction_count_threshold")
+            self.kind = "frequency"
+            self.field = map_field(spec.get("field") or "account_id")
+            self.time_field = map_field("transaction_time")
+            return
+
+        self.field = map_field(spec.get("field"))
+        if not self.field:
+            raise ValueError(f"condition without a field: {spec}")
+        if spec.get("compare_field"):
+            self.kind = "compare_field"
+            self.other = map_field(spec["compare_field"])
+            self.operator = self.operator or "!="
+        elif self.operator in SET_OPERATORS:
+            self.kind = "set"
+            if not spec.get("values"):
+                raise ValueError(f"'{self.operator}' condition on {self.field} needs values")
+        else:
+            self.kind = "value"
+            if spec.get("value") is None:
+                raise ValueError(f"condition on {self.field} needs a value")
+
+        if self.kind != "set" and self.operator not in OPERATOR_MAP:
+            raise ValueError(f"unsupported operator {self.operator}")
+
+    def columns(self):
+        if self.kind == "frequency":
+            return [self.field, self.time_field]
+        if self.kind == "compare_field":
+            return [self.field, self.other]
+        return [self.field]
+
+    def evaluate(self, ctx, rows=None):
+        return getattr(self, f"_{self.kind}")(ctx, rows)
+
+    def _frequency(self, ctx, rows):
+        window = self.spec["time_window_minutes"]
+        threshold = self.spec["transaction_count_threshold"]
+
+        def full_mask():
+            index = ctx.group_time_index(self.field, self.time_field)
+            mask = np.zeros(len(ctx.df), dtype=bool)
+            mask[frequency_row_ids(index, window, threshold)] = True
+            return mask
+
+        # Window counts depend on every transaction of the account, so the
+        # mask is computed for all rows once and then only looked up (in the
+        # context's bounded mask cache, as thresholds get tweaked often).
+        mask = ctx.mask(("frequency", self.field, self.time_field, window, threshold), full_mask)
+        return _take(mask, rows)
+
+    def _value(self, ctx, rows):
+        series = ctx.df[self.field]
+        op_func = OPERATOR_MAP[self.operator]
+        value = self.spec["value"]
+
+        if pd.api.types.is_datetime64_any_dtype(series):
+            times = _take(ctx.timestamps(self.field), rows)
+            return op_func(times, pd.Timestamp(value).value) & (times != np.iinfo(np.int64).min)
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if self.operator not in ("==", "!="):
+                raise ValueError(f"operator {self.operator} needs a numeric column, {self.field} is categorical")
+            code = series.cat.categories.get_indexer([value])[0]
+            codes = _take(ctx.codes(self.field), rows)
+            if code < 0:
+                # Value never occurs: == matches nothing, != every known value
+                return np.zeros(len(codes), dtype=bool) if self.operator == "==" else codes >= 0
+            return op_func(codes, code) & (codes >= 0)
+
+        if rows is None and self.operator != "!=":
+            # Whole column: a slice of its sorted index when it has one
+            hits = ctx.range_rows(self.field, self.operator, float(value))
+            if hits is not None:
+                mask = np.zeros(len(ctx.df), dtype=bool)
+                mask[hits] = True
+                return mask
+
+        if pd.api.types.is_numeric_dtype(series):
+            values = _take(ctx.numeric_values(self.field), rows)
+            return np.asarray(op_func(values, float(value)) & ~np.isnan(values.astype(np.float64)), dtype=bool)
+        values = _take(ctx.values(self.field), rows)
+        if self.operator not in ("==", "!="):
+            raise ValueError(f"operator {self.operator} needs a numeric column, {self.field} is text")
+        return np.asarray(op_func(values, value) & pd.notna(values), dtype=bool)
+
+    def _set(self, ctx, rows):
+        series = ctx.df[self.field]
+        wanted = self.spec["values"]
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = _take(ctx.codes(self.field), rows)
+            wanted_codes = series.cat.categories.get_indexer(wanted)
+            hit = np.isin(codes, wanted_codes[wanted_codes >= 0])
+            present = codes >= 0
+        else:
+            values = _take(ctx.values(self.field), rows)
+            hit = pd.Series(values).isin(wanted).to_numpy()
+            present = pd.notna(values)
+
+        # not_in: missing values match neither side
+        return hit if self.operator == "in" else ~hit & present
+
+    def _compare_field(self, ctx, rows):
+        df = ctx.df
+        op_func = OPERATOR_MAP[self.operator]
+        numeric = all(
+            pd.api.types.is_numeric_dtype(df[col]) and not isinstance(df[col].dtype, pd.CategoricalDtype)
+            for col in (self.field, self.other)
+        )
+        if numeric:
+            left = _take(ctx.values(self.field), rows).astype(np.float64)
+            right = _take(ctx.values(self.other), rows).astype(np.float64)
+            return op_func(left, right) & ~(np.isnan(left) | np.isnan(right))
+
+        if self.operator not in ("==", "!="):
+            raise ValueError(f"operator {self.operator} needs numeric columns")
+        left_codes, right_codes = ctx.shared_codes(self.field, self.other)
+        left_codes, right_codes = _take(left_codes, rows), _take(right_codes, rows)
+        return op_func(left_codes, right_codes) & (left_codes >= 0) & (right_codes >= 0)
+
+
+def compile_condition(spec):
+    """Predicate tree for a `condition` dict; ValueError if it is malformed"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"condition must be an object, got {spec!r}")
+    for key, node in (("all", AllOf), ("any", AnyOf)):
+        if spec.get(key) is not None:
+            if not spec[key]:
+                raise ValueError(f"'{key}' condition without terms")
+            return node([compile_condition(term) for term in spec[key]])
+    return Leaf(spec)
+
+
+def condition_columns(spec):
+    """Dataset columns a condition reads (empty if it doesn't compile)"""
+    try:
+        return compile_condition(spec).columns()
+    except ValueError:
+        return []
+
+
+def condition_window_fields(spec):
+    """Group columns of the frequency-window leaves in a condition"""
+    if not isinstance(spec, dict):
+        return []
+    if spec.get("time_window_minutes") is not None:
+        return [map_field(spec.get("field") or "account_id")]
+    return [col for key in ("all", "any") for term in spec.get(key) or [] for col in condition_window_fields(term)]
+
+
+def compound_mask(rule, ctx):
+    logger.debug("🔎 Executing Rule %s (Compound Rule)", rule.get("rule_id"))
+    try:
+        tree = compile_condition(rule["condition"])
+    except ValueError as e:
+        logger.warning("⚠️ Skipping rule %s - invalid condition: %s", rule.get("rule_id"), e)
+        return None
+
+    missing = sorted({col for col in tree.columns() if col not in ctx.df.columns})
+    if missing:
+        logger.warning("⚠️ Skipping rule %s - fields %s are missing in dataset", rule.get("rule_id"), missing)
+        return None
+
+    try:
+        return tree.evaluate(ctx)
+    except ValueError as e:
+        logger.warning("⚠️ Skipping rule %s - %s", rule.get("rule_id"), e)
+        return None
@@ -0,0 +1,154 @@
+# rule_engine/streaming.py
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .incremental import IncrementalState, check_incremental
+from .instrumentation import span
+from .interpreter import compile_policy, violation_frame
+from .loader import DATA_PATH, iter_dataset_chunks
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+class MemoryViolationSink:
+    """Collects violation frames in memory (small datasets and debugging)"""
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, violations):
+        self.frames.append(violations)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.frames = []
+
+    def to_frame(self):
+        if not self.frames:
+            return pd.DataFrame()
+        return pd.concat(self.frames)
+
+
+class ParquetViolationSink:
+    """
+    Appends violation frames to one Parquet file as they are produced.
+    Categorical columns are written as plain values because every chunk
+    comes with its own dictionary. Frames go to a temp file that close()
+    renames to `path`; abort() deletes it, so a failed run never leaves a
+    partial file that looks complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._writer = None
+
+    def write(self, violations):
+        if violations.empty:
+            return
+
+        table = pa.Table.from_pandas(violations, preserve_index=True)
+        for i, column in enumerate(table.columns):
+            if pa.types.is_dictionary(column.type):
+                table = table.set_column(i, table.field(i).name, pc.cast(column, column.type.value_type))
+
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def _rows_by_id(chunk, recent, row_ids):
+    """Rows for global row ids taken from the current chunk or the kept tail"""
+    offset = chunk.index[0] if len(chunk) else 0
+    parts = []
+    older = row_ids[row_ids < offset]
+    if len(older):
+        parts.append(recent.loc[older])
+    newer = row_ids[row_ids >= offset]
+    if len(newer):
+        parts.append(chunk.loc[newer])
+    if not parts:
+        return chunk.iloc[:0]
+    return parts[0] if len(parts) == 1 else pd.concat(parts)
+
+
+def stream_policy(rules, path=DATA_PATH, sink=None, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None):
+    """
+    Run a policy over a dataset chunk by chunk and write violations to `sink`
+    as each chunk is evaluated. Frequency window state carries across chunk
+    boundaries (see IncrementalState), so the result matches a full scan
+    while memory stays bounded by the chunk size plus the window tail.
+
+    Returns a summary of the run; the violations themselves go to the sink.
+    A row that a later chunk pushes over another frequency threshold is
+    written again carrying only the new rule bits. Rules that can't run
+    chunk by chunk raise before anything is written; if a chunk fails (e.g.
+    rows older than the frequency tail) the sink is aborted, not closed.
+    """
+    check_incremental(compile_policy(rules))
+
+    sink = sink if sink is not None else MemoryViolationSink()
+    state = IncrementalState()
+
+    summary = {"rows": 0, "chunks": 0, "violations": 0, "rule_counts": {}, "max_tail_rows": 0}
+    recent = None
+
+    try:
+        for chunk in iter_dataset_chunks(path, chunk_rows, columns):
+            offset = summary["rows"]
+            with span("stream_chunk") as s:
+                plan, row_ids, rule_mask = state.evaluate(rules, chunk, offset)
+                s.add(rows_scanned=len(chunk), rows_flagged=len(row_ids))
+
+            if len(row_ids):
+                rows = _rows_by_id(chunk, recent, row_ids)
+                violations = violation_frame(plan, rows, np.arange(len(rows)), rule_mask)
+                violations.index = pd.Index(row_ids, name="row_id")
+                sink.write(violations)
+
+                summary["violations"] += len(violations)
+                for rule_id, count in violations.attrs["rule_counts"].items():
+                    summary["rule_counts"][rule_id] = summary["rule_counts"].get(rule_id, 0) + count
+
+            # Keep full rows only for the frequency tail, so late flags on
+            # earlier chunks can still be written out with their data.
+            tail_ids = state.tail.row_ids if state.tail is not None else np.zeros(0, dtype=np.int64)
+            recent = _rows_by_id(chunk, recent, tail_ids)
+
+            summary["rows"] += len(chunk)
+            summary["chunks"] += 1
+            summary["max_tail_rows"] = max(summary["max_tail_rows"], len(tail_ids))
+    except BaseException:
+        sink.abort()
+        raise
+    sink.close()
+
+    logger.info(
+        "📌 Total flagged transactions across %d chunks of %s: %d",
+        summary["chunks"], path, summary["violations"],
+    )
+    return summary
@@ -0,0 +1,208 @@
+# rule_engine/windows.py
+import operator
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+
+def timestamps_ns(series):
+    """int64 nanoseconds since epoch; unparseable values become NaT"""
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors="coerce")
+    return series.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def group_codes(series):
+    """Integer code per row (-1 for missing) for a categorical or plain column"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64)
+    codes, _ = pd.factorize(series)
+    return codes.astype(np.int64)
+
+
+def shared_codes(left, right):
+    """
+    Integer codes (-1 for missing) for two columns over one value domain, so
+    equal values get equal codes in both. Categoricals that already share a
+    dictionary (see loader.SHARED_CATEGORY_COLUMNS) are used as they are;
+    other dictionaries are remapped onto the left one, which only touches
+    the categories, and plain columns are factorized together.
+    """
+    if isinstance(left.dtype, pd.CategoricalDtype) and isinstance(right.dtype, pd.CategoricalDtype):
+        left_codes = left.cat.codes.to_numpy().astype(np.int64)
+        right_codes = right.cat.codes.to_numpy().astype(np.int64)
+        left_categories, right_categories = left.cat.categories, right.cat.categories
+        if left_categories.equals(right_categories):
+            return left_codes, right_codes
+
+        mapping = left_categories.get_indexer(right_categories)
+        unmatched = mapping < 0
+        mapping[unmatched] = len(left_categories) + np.arange(np.count_nonzero(unmatched))
+        # Trailing -1 so that missing (-1) right codes stay missing
+        mapping = np.append(mapping, -1).astype(np.int64)
+        return left_codes, mapping[right_codes]
+
+    codes, _ = pd.factorize(pd.concat([left.astype("object"), right.astype("object")], ignore_index=True))
+    codes = codes.astype(np.int64)
+    return codes[:len(left)], codes[len(left):]
+
+
+def sort_by_group_time(codes, times):
+    """
+    Positional row ids of all valid rows (known group, parseable time),
+    ordered by (group, time). Ties keep their original row order.
+    """
+    valid = np.flatnonzero((codes >= 0) & (times != np.iinfo(np.int64).min))
+    order = np.lexsort((times[valid], codes[valid]))
+    return valid[order]
+
+
+def group_starts(sorted_codes):
+    """Offsets where each run of equal codes begins in a group-sorted array"""
+    if not len(sorted_codes):
+        return np.zeros(0, dtype=np.int64)
+    changes = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+    return np.concatenate([[0], changes]).astype(np.int64)
+
+
+@dataclass
+class GroupTimeIndex:
+    """Valid rows sorted by (group, time), with dense 0..k-1 group ids"""
+    order: np.ndarray
+    group_ids: np.ndarray
+    times: np.ndarray
+    starts: np.ndarray
+
+    @property
+    def n_groups(self):
+        return len(self.starts)
+
+
+def build_group_time_index(codes, times):
+    order = sort_by_group_time(codes, times)
+    sorted_codes = codes[order]
+    starts = group_starts(sorted_codes)
+
+    group_ids = np.zeros(len(order), dtype=np.int64)
+    group_ids[starts[1:]] = 1
+    group_ids = np.cumsum(group_ids)
+
+    return GroupTimeIndex(order=order, group_ids=group_ids, times=times[order], starts=starts)
+
+
+def _window_keys(group_ids, times, window_ns):
+    """
+    Collapse (group, time) into one monotonically increasing int64 key per
+    row, plus the matching key of each row's window lower bound, so a single
+    searchsorted over the whole array stays inside each group.
+    """
+    lower = times - window_ns
+    t_min = lower.min() if len(lower) else 0
+    span = int(times.max() - t_min) + 1 if len(times) else 1
+    n_groups = int(group_ids.max()) + 1 if len(group_ids) else 1
+
+    if n_groups * span < 2 ** 62:
+        return group_ids * span + (times - t_min), group_ids * span + (lower - t_min)
+
+    # Time span too wide to offset groups directly: compress times to ranks
+    values, inverse = np.unique(np.concatenate([times, lower]), return_inverse=True)
+    span = len(values) + 1
+    n = len(times)
+    return group_ids * span + inverse[:n], group_ids * span + inverse[n:]
+
+
+def window_starts(group_ids, times, window_ns):
+    """
+    For each row of a (group, time)-sorted array, the position of the first
+    row of the same group inside its window (t - window, t]. Earlier rows on
+    the same timestamp are inside, matching a time-based pandas rolling window.
+    """
+    keys, lower_keys = _window_keys(group_ids, times, window_ns)
+    return np.searchsorted(keys, lower_keys, side="right")
+
+
+def sliding_window_counts(group_ids, times, window_ns):
+    """
+    Number of rows of the same group in the time window (t - window, t],
+    counting the row itself and earlier rows only - the same definition as
+    a time-based pandas rolling count. Inputs must already be sorted by
+    (group, time); runs in one searchsorted pass.
+    """
+    starts = window_starts(group_ids, times, window_ns)
+    return np.arange(len(starts)) - starts + 1
+
+
+def _window_counts(flags, starts):
+    """Per-row number of set flags over [start, row]"""
+    prefix = np.concatenate([[0], np.cumsum(flags, dtype=np.int64)])
+    return prefix[1:] - prefix[starts]
+
+
+def _window_sums(values, starts):
+    """
+    Per-row sums over [start, row] from prefix sums. Amounts with at most
+    two decimals are summed exactly as int64 cents (so large running totals
+    don't eat the precision of small windows); anything else uses float64.
+    """
+    cents = np.round(values * 100)
+    if np.array_equal(cents / 100, values) and np.abs(cents).sum() < 2 ** 62:
+        prefix = np.concatenate([[0], np.cumsum(cents.astype(np.int64))])
+        return (prefix[1:] - prefix[starts]) / 100
+    prefix = np.concatenate([[0.0], np.cumsum(values)])
+    return prefix[1:] - prefix[starts]
+
+
+def window_aggregate_row_ids(index, values, window_minutes, aggregate, op_func, threshold, include=None):
+    """
+    Positional row ids whose trailing window (t - window, t] within their
+    group satisfies `aggregate(values) <op> threshold`, for aggregate in
+    sum/mean/max. `include` restricts which rows are aggregated (and can be
+    flagged); rows with a missing value are never included.
+
+    Sums and means come from prefix sums over the (group, time)-sorted
+    values; `max <op> threshold` is answered as "some / no value in the
+    window passes the threshold", which is a prefix count as well. No
+    per-group loops, one searchsorted for all window bounds.
+    """
+    sorted_values = np.asarray(values, dtype=np.float64)[index.order]
+    included = ~np.isnan(sorted_values)
+    if include is not None:
+        included &= np.asarray(include, dtype=bool)[index.order]
+
+    starts = window_starts(index.group_ids, index.times, int(window_minutes * NS_PER_MINUTE))
+    counts = _window_counts(included, starts)
+
+    if aggregate == "max":
+        # max > x  <=>  some value > x;   max < x  <=>  no value >= x
+        if op_func in (operator.gt, operator.ge):
+            passing = op_func(sorted_values, threshold) & included
+            hits = _window_counts(passing, starts) > 0
+        elif op_func in (operator.lt, operator.le):
+            failing = ~op_func(sorted_values, threshold) & included
+            hits = _window_counts(failing, starts) == 0
+        else:
+            raise ValueError("max windows support >, >=, < and <= only")
+    else:
+        totals = _window_sums(np.where(included, sorted_values, 0.0), starts)
+        if aggregate == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                totals = totals / counts
+        elif aggregate != "sum":
+            raise ValueError(f"unsupported aggregate {aggregate}")
+        hits = op_func(totals, threshold)
+
+    return np.sort(index.order[hits & included & (counts > 0)])
+
+
+def frequency_row_ids(index, window_minutes, count_threshold):
+    """
+    Positional row ids of transactions whose account made more than
+    `count_threshold` transactions in the trailing `window_minutes`.
+    `index` is the GroupTimeIndex over (account, time).
+    """
+    window_ns = int(window_minutes * NS_PER_MINUTE)
+    counts = sliding_window_counts(index.group_ids, index.times, window_ns)
+    return np.sort(index.order[counts > count_threshold])
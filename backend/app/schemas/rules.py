@@ -1,12 +1,34 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import List, Optional, Literal, Union
 
 Operator = Literal[">", ">=", "<", "<=", "==", "!="]
+ConditionOperator = Literal[">", ">=", "<", "<=", "==", "!=", "in", "not_in"]
+
+class Condition(BaseModel):
+    """One predicate, or an AND ("all") / OR ("any") of nested conditions"""
+    all: Optional[List["Condition"]] = None
+    any: Optional[List["Condition"]] = None
+
+    # leaf: field <operator> value | values | compare_field
+    field: Optional[str] = None
+    operator: Optional[ConditionOperator] = None
+    value: Optional[Union[float, str]] = None
+    values: Optional[List[str]] = None
+    compare_field: Optional[str] = None
+
+    # leaf: more than transaction_count_threshold transactions per account
+    # (field, default account_id) within time_window_minutes
+    time_window_minutes: Optional[int] = None
+    transaction_count_threshold: Optional[int] = None
 
 class Rule(BaseModel):
     rule_id: str = Field(..., examples=["R1"])
     description: str
 
+    # executor to run the rule with (see rule_engine/executors.py);
+    # inferred from the fields below when missing
+    rule_type: Optional[str] = None
+
     # basic rule type
     field: Optional[str] = None
     operator: Optional[Operator] = None
@@ -23,6 +45,27 @@ class Rule(BaseModel):
     sender_bank_field: Optional[str] = None
     receiver_bank_field: Optional[str] = None
 
+    # for column-to-column comparisons: field <operator> compare_field
+    compare_field: Optional[str] = None
+
+    # for amount-aggregation windows: aggregate(field) over the account's
+    # (or counterparty's) last time_window_minutes <operator> threshold,
+    # optionally counting only transactions below amount_below
+    aggregate: Optional[Literal["sum", "mean", "max"]] = None
+    group_by: Optional[Literal["account", "counterparty"]] = None
+    amount_below: Optional[float] = None
+
+    # for graph rules on sender -> receiver transfers: fan_out / fan_in
+    # (more than counterparty_threshold distinct counterparties within
+    # time_window_minutes) or cycle (back to the sender within
+    # time_window_minutes through at most max_cycle_length transfers)
+    graph: Optional[Literal["fan_out", "fan_in", "cycle"]] = None
+    counterparty_threshold: Optional[int] = None
+    max_cycle_length: Optional[int] = None
+
+    # for compound rules (all other rule fields are ignored)
+    condition: Optional[Condition] = None
+
 class PolicyRules(BaseModel):
     policy_name: str = "Policy"
     rules: List[Rule]
\ No newline at end of file
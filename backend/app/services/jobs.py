@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from app.rule_engine.datasets import file_version
+from app.services.policy_runs import DATA_PATH, run_policy
+from app.storage.extraction_cache import content_hash
+from app.storage.rules_store import rule_store
+
+# Policy runs executing at once, and how many more may wait for a worker
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "16"))
+
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 100
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    job_id: str
+    key: str
+    rules_version: str
+    data_path: str
+    status: str = "queued"
+    stage: str = None
+    rules: dict = field(default_factory=dict)
+    events: list = field(default_factory=list)
+    run: dict = None
+    error: str = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+
+    @property
+    def finished(self):
+        return self.status not in ACTIVE_STATES
+
+    def snapshot(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "rules_version": self.rules_version,
+            "rules": self.rules,
+            "run_id": self.run["run_id"] if self.run else None,
+            "violations_found": self.run["violations"] if self.run else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def job_key(data_path, rules_version):
+    """Dataset file version + rules version; equal keys produce equal runs"""
+    return content_hash(os.path.abspath(data_path), repr(file_version(data_path)), rules_version)
+
+
+class JobManager:
+    """
+    Runs policies in the background on a bounded worker pool.
+
+    Submitting returns a job right away; at most `workers` jobs execute at
+    once and `max_queued` more may wait, beyond that submissions are
+    rejected with QueueFull. A submission whose dataset version and rules
+    version match a queued or running job gets that job back instead of a
+    new one. Progress (stages and per-rule counts) is recorded as events
+    that clients can poll or stream.
+    """
+
+    def __init__(self, runner=run_policy, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="policy-job")
+        return self._pool
+
+    def submit(self, rules=None, data_path=DATA_PATH):
+        """Queue a run of `rules` (default: active version); returns (job, deduplicated)"""
+        rules = rules or rule_store.current()
+        key = job_key(data_path, rules.version)
+
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job, True
+            if len(self._in_flight) >= self.workers + self.max_queued:
+                raise QueueFull(f"{len(self._in_flight)} policy runs already queued or running")
+
+            job = Job(uuid.uuid4().hex[:12], key, rules.version, data_path)
+            self._jobs[job.job_id] = job
+            self._in_flight[key] = job
+            self._forget_finished()
+            self._record(job, {"status": "queued"})
+            self._executor().submit(self._run, job, rules)
+        return job, False
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _record(self, job, event):
+        """Append an event and wake up streaming readers (lock held)"""
+        job.events.append({"time": time.time(), **event})
+        self._changed.notify_all()
+
+    def _report(self, job, event):
+        with self._lock:
+            if event["stage"] == "rule":
+                job.rules[event["rule_id"]] = {"flagged": event["flagged"], "seconds": event["seconds"]}
+            else:
+                job.stage = event["stage"]
+            self._record(job, event)
+
+    def _run(self, job, rules):
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+            self._record(job, {"status": "running"})
+
+        run, error = None, None
+        try:
+            run, _ = self.runner(rules=rules, data_path=job.data_path, report=lambda event: self._report(job, event))
+        except Exception as e:
+            error = str(e)
+
+        # Status and final event change together, so a reader that sees the
+        # job finished has also seen its last event
+        with self._lock:
+            job.status = "failed" if error is not None else "done"
+            job.run, job.error = run, error
+            job.finished_at = time.time()
+            self._in_flight.pop(job.key, None)
+            self._record(job, {"status": job.status, "error": error})
+
+    def get(self, job_id) -> Job:
+        """KeyError for unknown (or already forgotten) jobs"""
+        with self._lock:
+            return self._jobs[job_id]
+
+    def jobs(self):
+        with self._lock:
+            return [job.snapshot() for job in reversed(self._jobs.values())]
+
+    def wait_events(self, job, start, timeout=None):
+        """Events from index `start` on, blocking up to `timeout` until there is one"""
+        with self._lock:
+            if len(job.events) <= start and not job.finished:
+                self._changed.wait(timeout)
+            return job.events[start:]
+
+    def stats(self):
+        with self._lock:
+            states = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            **{state: states.count(state) for state in ("queued", "running", "done", "failed")},
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+job_manager = JobManager()
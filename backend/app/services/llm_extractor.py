@@ -1,8 +1,181 @@
 import os
 import json
 import re
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 
+from app.rule_engine.instrumentation import Histogram
+
+# Model name can be gemini-1.5-flash or gemini-1.5-pro
+MODEL_NAME = "gemini-1.5-flash"
+
+PROMPT_TEMPLATE = """
+You are a compliance rule extraction engine.
+
+Extract compliance rules from the policy text below.
+
+Return STRICT JSON ONLY (no markdown, no extra text).
+
+Schema:
+{{
+  "policy_name": "string",
+  "rules": [
+    {{
+      "rule_id": "R1",
+      "description": "string",
+      "field": "string | null",
+      "operator": "> | >= | < | <= | == | != | null",
+      "threshold": "number | null",
+      "time_window_minutes": "number | null",
+      "transaction_count_threshold": "number | null",
+      "payment_methods": ["string"] ,
+      "sender_bank_field": "string | null",
+      "receiver_bank_field": "string | null",
+      "compare_field": "string | null",
+      "aggregate": "sum | mean | max | null",
+      "group_by": "account | counterparty | null",
+      "amount_below": "number | null",
+      "graph": "fan_out | fan_in | cycle | null",
+      "counterparty_threshold": "number | null",
+      "max_cycle_length": "number | null",
+      "condition": "object | null"
+    }}
+  ]
+}}
+
+Use "condition" only for rules that combine several conditions. It is either
+{{"all": [conditions]}} (AND), {{"any": [conditions]}} (OR), or one condition:
+{{"field": "...", "operator": "> | >= | < | <= | == | != | in | not_in", "value": ..., "values": [...]}},
+{{"field": "...", "operator": "== | !=", "compare_field": "..."}} or
+{{"time_window_minutes": n, "transaction_count_threshold": n}}.
+
+Use "aggregate" for rules on the total, average or largest amount within
+time_window_minutes (per account, or per counterparty with "group_by"),
+compared with "threshold"; "amount_below" limits it to transactions under
+that amount (e.g. structuring: several deposits under 10000 adding up to
+more than 10000 within a day).
+
+Use "graph" for rules about who pays whom: "fan_out" / "fan_in" when an
+account sends to / receives from more than "counterparty_threshold" distinct
+accounts (within time_window_minutes if given), "cycle" when money returns
+to the sender through at most "max_cycle_length" (2 or 3) transfers within
+time_window_minutes.
+
+Policy text:
+{policy_text}
+"""
+
+# Changes whenever the prompt text does, so cached extractions made with an
+# older prompt are not reused.
+PROMPT_VERSION = hashlib.sha256(PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# Long policies are split into chunks of about this many characters
+CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "12000"))
+
+# Upper bound on concurrent model calls per extractor
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+
+# Retry/deadline settings for model calls
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "60"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+
+# A line that starts a new section: "1.", "2)", "2.3", "Section 4",
+# "Article IV", "§ 12", or a short ALL-CAPS heading line. A bare number
+# isn't enough: wrapped sentences often start with one ("10000 USD within
+# 24 hours ...").
+NUMBERED_HEADING = re.compile(
+    r"^\s*(?:(?:section|article|chapter|part)\s+[\w.]+|§\s*\d+|(?:\d+(?:\.\d+)+[.)]?|\d+[.)])\s+\S)",
+    re.IGNORECASE,
+)
+CAPS_HEADING = re.compile(r"^\s*[A-Z][A-Z0-9 ,&/()-]{3,80}\s*$")
+
+def _is_heading(line: str) -> bool:
+    return bool(NUMBERED_HEADING.match(line) or CAPS_HEADING.match(line))
+
+def _sections(text: str) -> list:
+    sections, current = [], []
+    for line in text.splitlines(keepends=True):
+        if _is_heading(line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+def _split_oversized(section: str, max_chars: int) -> list:
+    """Split a section that alone exceeds max_chars on paragraphs, then lines"""
+    pieces, current = [], ""
+    for part in re.split(r"(\n\s*\n)", section):
+        if len(current) + len(part) > max_chars and current:
+            pieces.append(current)
+            current = ""
+        while len(part) > max_chars:
+            cut = part.rfind("\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(part[:cut])
+            part = part[cut:]
+        current += part
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_policy_sections(text: str, max_chars: int = None) -> list:
+    """
+    Split policy text on section boundaries into chunks of at most
+    `max_chars` characters, packing consecutive small sections together.
+    """
+    max_chars = max_chars or CHUNK_CHARS
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks, current = [], ""
+    for section in _sections(text):
+        for piece in _split_oversized(section, max_chars) if len(section) > max_chars else [section]:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+def _rule_signature(rule: dict) -> str:
+    """Everything that makes a rule behave differently (not its id/wording)"""
+    body = {k: v for k, v in rule.items() if k not in ("rule_id", "description")}
+    for key, value in body.items():
+        if isinstance(value, list):
+            body[key] = sorted(str(v).strip().lower() for v in value)
+        elif isinstance(value, str):
+            body[key] = value.strip().lower()
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            body[key] = float(value)
+    return json.dumps(body, sort_keys=True, default=str)
+
+def merge_policy_rules(results: list) -> dict:
+    """
+    Merge per-chunk extraction results into one policy: first real policy
+    name wins, rules that only differ in id/description are kept once, and
+    rule ids are renumbered R1..Rn in document order.
+    """
+    names = [r.get("policy_name") for r in results if r.get("policy_name") not in (None, "", "Policy")]
+    merged, seen = [], set()
+    for result in results:
+        for rule in result.get("rules") or []:
+            signature = _rule_signature(rule)
+            if signature in seen:
+                continue
+            seen.add(signature)
+            merged.append(dict(rule, rule_id=f"R{len(merged) + 1}"))
+
+    return {"policy_name": names[0] if names else "Policy", "rules": merged}
+
 def _extract_json_object(text: str) -> dict:
     """
     Robustly extract the first JSON object from a model response.
@@ -26,111 +199,312 @@ def _extract_json_object(text: str) -> dict:
     json_str = text[start : end + 1]
     return json.loads(json_str)
 
-def extract_rules_json_with_llm(policy_text: str) -> dict:
-    api_key = os.getenv("GOOGLE_API_KEY")
-    # ✅ DEMO FALLBACK (AML POLICY)
-    if not api_key:
+# ✅ DEMO FALLBACK (AML POLICY), answered when no GOOGLE_API_KEY is set
+DEMO_POLICY_RULES = {
+    "policy_name": "Anti-Money Laundering Monitoring Policy",
+    "rules": [
+        {
+            "rule_id": "R1",
+            "description": "All transactions exceeding 1,000,000 units must be flagged for review.",
+            "field": "amount",
+            "operator": ">",
+            "threshold": 1000000,
+            "time_window_minutes": None,
+            "transaction_count_threshold": None,
+            "payment_methods": [],
+            "sender_bank_field": None,
+            "receiver_bank_field": None,
+        },
+        {
+            "rule_id": "R2",
+            "description": "Transactions involving different sending and receiving banks must be monitored.",
+            "field": None,
+            "operator": None,
+            "threshold": None,
+            "time_window_minutes": None,
+            "transaction_count_threshold": None,
+            "payment_methods": [],
+            "sender_bank_field": "sender_bank",
+            "receiver_bank_field": "receiver_bank",
+        },
+        {
+            "rule_id": "R3",
+            "description": "If an account initiates more than 5 transactions within 10 minutes, the activity must be flagged.",
+            "field": None,
+            "operator": None,
+            "threshold": None,
+            "time_window_minutes": 10,
+            "transaction_count_threshold": 5,
+            "payment_methods": [],
+            "sender_bank_field": None,
+            "receiver_bank_field": None,
+        },
+        {
+            "rule_id": "R4",
+            "description": "Transactions using Cash or Cheque above 50,000 units must be reviewed.",
+            "field": "amount",
+            "operator": ">",
+            "threshold": 50000,
+            "time_window_minutes": None,
+            "transaction_count_threshold": None,
+            "payment_methods": ["Cash", "Cheque"],
+            "sender_bank_field": None,
+            "receiver_bank_field": None,
+        },
+    ],
+}
+
+
+class GeminiBackend:
+    """
+    google.generativeai backend. The client is configured once and the
+    model handle (and with it the underlying gRPC channel) is reused for
+    every call instead of being rebuilt per upload.
+    """
+
+    def __init__(self, api_key, model_name=MODEL_NAME):
+        genai.configure(api_key=api_key)
+        self.name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: float):
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout})
+
+        # Different versions sometimes store output differently
+        raw_text = getattr(response, "text", None)
+        if not raw_text and hasattr(response, "candidates") and response.candidates:
+            raw_text = response.candidates[0].content.parts[0].text
+
+        usage = getattr(response, "usage_metadata", None)
+        tokens = {
+            "prompt": getattr(usage, "prompt_token_count", None),
+            "output": getattr(usage, "candidates_token_count", None),
+        }
+        return raw_text, tokens
+
+
+class ModelBackend:
+    """Wraps any object with generate_content(prompt) -> response.text"""
+
+    def __init__(self, model, name="custom"):
+        self.model = model
+        self.name = name
+
+    def generate(self, prompt: str, timeout: float):
+        return self.model.generate_content(prompt).text, {}
+
+
+class FakeBackend:
+    """
+    Local backend for tests and offline runs. `responses` are returned in
+    order (cycling on the last one); a `handler(prompt)` overrides them.
+    Exceptions in `responses` are raised instead of returned.
+    """
+
+    def __init__(self, responses=None, handler=None, name="fake"):
+        self.responses = list(responses or [json.dumps(DEMO_POLICY_RULES)])
+        self.handler = handler
+        self.name = name
+        self.prompts = deque(maxlen=100)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, timeout: float):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.calls += 1
+            index = min(self.calls, len(self.responses)) - 1
+        response = self.handler(prompt) if self.handler else self.responses[index]
+        if isinstance(response, Exception):
+            raise response
+        return response, {"prompt": len(prompt) // 4, "output": len(response) // 4}
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of calls so a failing model can't multiply
+    load: every call earns `ratio` tokens (up to `max_tokens`), every retry
+    spends one.
+    """
+
+    def __init__(self, ratio=0.2, initial_tokens=3.0, max_tokens=10.0):
+        self.ratio = ratio
+        self.tokens = initial_tokens
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120]
+TOKEN_BUCKETS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+
+class RuleExtractor:
+    """
+    Long-lived rule extraction service: one backend handle, a bounded pool
+    for concurrent chunk calls, retries with jittered exponential backoff
+    under a shared retry budget, a per-attempt timeout and an overall
+    deadline per chunk, plus latency and token histograms.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_in_flight=LLM_MAX_IN_FLIGHT,
+        max_attempts=LLM_MAX_ATTEMPTS,
+        call_timeout=LLM_CALL_TIMEOUT_SECONDS,
+        deadline=LLM_DEADLINE_SECONDS,
+        retry_budget=None,
+        backoff_base=0.5,
+        backoff_cap=8.0,
+    ):
+        self.backend = backend
+        self.max_attempts = max_attempts
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.retry_budget = retry_budget or RetryBudget()
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm-chunk")
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "malformed": 0}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.output_tokens = Histogram(TOKEN_BUCKETS)
+
+    @property
+    def identity(self) -> str:
+        """Which backend/model/prompt answers (for cache keys)"""
+        return f"{self.backend.name}:{PROMPT_VERSION}:chunk{CHUNK_CHARS}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _backoff(self, attempt, remaining):
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        time.sleep(max(0.0, min(delay, remaining)))
+
+    def extract_chunk(self, policy_text: str) -> dict:
+        prompt = PROMPT_TEMPLATE.format(policy_text=policy_text).strip()
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt and not self.retry_budget.try_spend():
+                break
+            if attempt:
+                self._count("retries")
+
+            self._count("calls")
+            self.retry_budget.record_call()
+            started = time.perf_counter()
+            try:
+                raw_text, tokens = self.backend.generate(prompt, timeout=min(self.call_timeout, remaining))
+            except Exception as e:
+                last_error = e
+                self._count("failures")
+                if attempt < self.max_attempts - 1:
+                    self._backoff(attempt, deadline - time.monotonic())
+                continue
+            finally:
+                self.latency.observe(time.perf_counter() - started)
+
+            self.prompt_tokens.observe(tokens.get("prompt"))
+            self.output_tokens.observe(tokens.get("output"))
+
+            try:
+                return _extract_json_object(raw_text)
+            except Exception as e:
+                # Malformed JSON is usually a one-off; ask again
+                last_error = e
+                self._count("malformed")
+                if attempt < self.max_attempts - 1:
+                    self._backoff(attempt, deadline - time.monotonic())
+
+        # If every attempt failed, raise explicit error instead of silently fallback
+        raise RuntimeError(f"Model returned non-JSON or malformed JSON. Error: {last_error}")
+
+    def extract(self, policy_text: str) -> dict:
+        """Extract rules, splitting long texts and running chunks concurrently"""
+        chunks = split_policy_sections(policy_text)
+        if len(chunks) <= 1:
+            return self.extract_chunk(policy_text)
+        return merge_policy_rules(list(self._pool.map(self.extract_chunk, chunks)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
         return {
-            "policy_name": "Anti-Money Laundering Monitoring Policy",
-            "rules": [
-                {
-                    "rule_id": "R1",
-                    "description": "All transactions exceeding 1,000,000 units must be flagged for review.",
-                    "field": "amount",
-                    "operator": ">",
-                    "threshold": 1000000,
-                    "time_window_minutes": None,
-                    "transaction_count_threshold": None,
-                    "payment_methods": [],
-                    "sender_bank_field": None,
-                    "receiver_bank_field": None,
-                },
-                {
-                    "rule_id": "R2",
-                    "description": "Transactions involving different sending and receiving banks must be monitored.",
-                    "field": None,
-                    "operator": None,
-                    "threshold": None,
-                    "time_window_minutes": None,
-                    "transaction_count_threshold": None,
-                    "payment_methods": [],
-                    "sender_bank_field": "sender_bank",
-                    "receiver_bank_field": "receiver_bank",
-                },
-                {
-                    "rule_id": "R3",
-                    "description": "If an account initiates more than 5 transactions within 10 minutes, the activity must be flagged.",
-                    "field": None,
-                    "operator": None,
-                    "threshold": None,
-                    "time_window_minutes": 10,
-                    "transaction_count_threshold": 5,
-                    "payment_methods": [],
-                    "sender_bank_field": None,
-                    "receiver_bank_field": None,
-                },
-                {
-                    "rule_id": "R4",
-                    "description": "Transactions using Cash or Cheque above 50,000 units must be reviewed.",
-                    "field": "amount",
-                    "operator": ">",
-                    "threshold": 50000,
-                    "time_window_minutes": None,
-                    "transaction_count_threshold": None,
-                    "payment_methods": ["Cash", "Cheque"],
-                    "sender_bank_field": None,
-                    "receiver_bank_field": None,
-                },
-            ],
+            "backend": self.backend.name,
+            "identity": self.identity,
+            **counters,
+            "retry_tokens": self.retry_budget.tokens,
+            "latency_seconds": self.latency.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "output_tokens": self.output_tokens.snapshot(),
         }
 
-    genai.configure(api_key=api_key)
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
 
-    # Model name can be gemini-1.5-flash or gemini-1.5-pro
-    model = genai.GenerativeModel("gemini-1.5-flash")
 
-    prompt = f"""
-You are a compliance rule extraction engine.
+_extractor = None
+_extractor_lock = threading.Lock()
 
-Extract compliance rules from the policy text below.
 
-Return STRICT JSON ONLY (no markdown, no extra text).
+def get_rule_extractor() -> RuleExtractor:
+    """Process-wide extractor: Gemini when GOOGLE_API_KEY is set, demo otherwise"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if api_key:
+                backend = GeminiBackend(api_key)
+            else:
+                backend = FakeBackend(name="demo-fallback")
+            _extractor = RuleExtractor(backend)
+        return _extractor
 
-Schema:
-{{
-  "policy_name": "string",
-  "rules": [
-    {{
-      "rule_id": "R1",
-      "description": "string",
-      "field": "string | null",
-      "operator": "> | >= | < | <= | == | != | null",
-      "threshold": "number | null",
-      "time_window_minutes": "number | null",
-      "transaction_count_threshold": "number | null",
-      "payment_methods": ["string"] ,
-      "sender_bank_field": "string | null",
-      "receiver_bank_field": "string | null"
-    }}
-  ]
-}}
 
-Policy text:
-{policy_text}
-""".strip()
+def set_rule_extractor(extractor) -> None:
+    """Swap the process-wide extractor (e.g. for a FakeBackend in tests)"""
+    global _extractor
+    with _extractor_lock:
+        if _extractor is not None and _extractor is not extractor:
+            _extractor.close()
+        _extractor = extractor
 
-    response = model.generate_content(prompt)
 
-    # Different versions sometimes store output differently
-    raw_text = getattr(response, "text", None)
-    if not raw_text and hasattr(response, "candidates") and response.candidates:
-        raw_text = response.candidates[0].content.parts[0].text
+def extractor_identity() -> str:
+    return get_rule_extractor().identity
 
-    # Debug print (TEMPORARY): helps you see what's going on
-    print("\n--- GEMINI RAW OUTPUT START ---\n", raw_text, "\n--- GEMINI RAW OUTPUT END ---\n")
 
+def extract_rules_json_with_llm(policy_text: str, model=None) -> dict:
+    """
+    Extract policy rules as JSON through the shared RuleExtractor. Passing
+    `model` (anything with generate_content) runs a one-off extractor
+    around it instead.
+    """
+    if model is None:
+        return get_rule_extractor().extract(policy_text)
+
+    extractor = RuleExtractor(ModelBackend(model))
     try:
-        return _extract_json_object(raw_text)
-    except Exception as e:
-        # If parsing failed, raise explicit error instead of silently fallback
-        raise RuntimeError(f"Gemini returned non-JSON or malformed JSON. Error: {e}")
\ No newline at end of file
+        return extractor.extract(policy_text)
+    finally:
+        extractor.close()
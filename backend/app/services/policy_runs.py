@@ -0,0 +1,80 @@
+import os
+
+from app.rule_engine import (
+    execute_policy, compute_metrics, dataset_registry,
+    ensure_parquet, LABEL_COLUMN,
+    execute_policy_parallel, configured_workers,
+)
+from app.storage.rules_store import rule_store
+from app.storage.results_store import result_store, run_id_for
+
+# Demo dataset lives in <repo>/data
+BASE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../../")
+)
+
+DATA_PATH = os.path.join(BASE_DIR, "data", "HI-Small_Trans.csv")
+
+
+def _ignore(event):
+    pass
+
+
+def run_policy(rules=None, data_path=DATA_PATH, report=None):
+    """
+    Load -> execute -> metrics -> store for one rule version (default: the
+    active one). Returns (run metadata, dataset entry). A run that was
+    already stored for the same dataset and rules version is reused.
+
+    `report(event)` receives progress dicts: {"stage": ...} when a stage
+    starts and {"stage": "rule", "rule_id", "flagged", "seconds"} after
+    each rule.
+    """
+    report = report or _ignore
+    rules = rules or rule_store.current()
+    policy = rules.policy
+
+    # 1. Load policy and dataset (only the columns the plan reads)
+    report({"stage": "load_dataset"})
+    plan = rule_store.plan(rules)
+    columns = plan.columns + [LABEL_COLUMN]
+    dataset = dataset_registry.entry(ensure_parquet(data_path), columns=columns)
+    df = dataset.df
+
+    # Same dataset version + rules version were already run: reuse the stored result
+    run_id = run_id_for(dataset.path, dataset.version, rules.version)
+    if result_store.exists(run_id):
+        return result_store.meta(run_id), dataset
+
+    # 2. Execute rules (RULE_ENGINE_WORKERS > 1 spreads them over processes)
+    report({"stage": "execute"})
+
+    def rule_done(step, flagged, seconds):
+        report({"stage": "rule", "rule_id": step.rule_id, "flagged": flagged, "seconds": seconds})
+
+    if configured_workers() > 1:
+        violations = execute_policy_parallel(policy["rules"], df)
+        for step in plan.steps:
+            rule_done(step, violations.attrs["rule_counts"][step.rule_id], None)
+    else:
+        violations = execute_policy(policy["rules"], df, context=dataset.context, plan=plan, progress=rule_done)
+
+    # 3. Compute metrics (if label exists)
+    report({"stage": "metrics"})
+    if LABEL_COLUMN in df.columns:
+        metrics = compute_metrics(df, violations)
+    else:
+        metrics = None
+
+    # 4. Keep the full result (row ids + rule bits) for paging
+    report({"stage": "save"})
+    run = result_store.save(run_id, violations, {
+        "dataset_path": dataset.path,
+        "dataset_version": list(dataset.version),
+        "columns": columns,
+        "rules_version": rules.version,
+        "policy_name": policy["policy_name"],
+        "total_transactions": len(df),
+        "metrics": metrics,
+    })
+    return run, dataset
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.rule_engine.parallel import process_context
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# Pool sizes and per-stage limits, overridable through the environment
+PDF_WORKERS = _env_int("PDF_WORKERS", min(4, os.cpu_count() or 1))
+LLM_THREADS = _env_int("LLM_THREADS", 8)
+PDF_TIMEOUT_SECONDS = _env_float("PDF_TIMEOUT_SECONDS", 60)
+LLM_TIMEOUT_SECONDS = _env_float("LLM_TIMEOUT_SECONDS", 120)
+DISK_IO_THREADS = _env_int("DISK_IO_THREADS", 2)
+
+_lock = threading.Lock()
+_process_pool = None
+_thread_pool = None
+_disk_io_pool = None
+
+
+def process_pool():
+    """Shared pool for CPU-bound work (PDF parsing), started without fork (see process_context)"""
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=process_context())
+        return _process_pool
+
+
+def thread_pool():
+    """Shared pool for long blocking calls (LLM requests, gathering PDF pages)"""
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=LLM_THREADS, thread_name_prefix="blocking")
+        return _thread_pool
+
+
+def disk_io_pool():
+    """
+    Small pool for short disk I/O (extraction cache, rule store), kept apart
+    from the thread pool so cache hits don't queue behind slow LLM calls
+    """
+    global _disk_io_pool
+    with _lock:
+        if _disk_io_pool is None:
+            _disk_io_pool = ThreadPoolExecutor(max_workers=DISK_IO_THREADS, thread_name_prefix="disk-io")
+        return _disk_io_pool
+
+
+def shutdown_pools():
+    global _process_pool, _thread_pool, _disk_io_pool
+    with _lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+        if _thread_pool is not None:
+            _thread_pool.shutdown(cancel_futures=True)
+        if _disk_io_pool is not None:
+            _disk_io_pool.shutdown(cancel_futures=True)
+        _process_pool = _thread_pool = _disk_io_pool = None
+
+
+class WorkTimeout(asyncio.TimeoutError):
+    """
+    An offloaded call timed out. Threads can't be interrupted, so the work
+    may still be running: `pending` is its concurrent future, for callers
+    that must keep resources held until it really finishes.
+    """
+
+    def __init__(self, pending):
+        super().__init__()
+        self.pending = pending
+
+
+async def run_in_thread(fn, *args, timeout=None):
+    """
+    Run blocking `fn(*args)` in the thread pool, with an optional timeout.
+    Raises WorkTimeout (an asyncio.TimeoutError) when it expires.
+    """
+    future = thread_pool().submit(fn, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        raise WorkTimeout(future)
+
+
+async def run_disk_io(fn, *args):
+    """Run a short blocking file read/write on the disk I/O pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(disk_io_pool(), fn, *args)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "cache" / "extraction"
+MAX_CACHE_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def content_hash(*parts) -> str:
+    """sha256 over bytes/str parts, separated so ('ab', 'c') != ('a', 'bc')"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def normalize_policy_text(text: str) -> str:
+    """Whitespace-insensitive form of extracted text, used for cache keys"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class ContentCache:
+    """
+    Content-addressed on-disk cache with size-based LRU eviction.
+
+    Entries live at <root>/<namespace>/<key[:2]>/<key>, are written
+    atomically (temp file + rename) and have their mtime bumped on every
+    hit, so the least recently used files are evicted first once the total
+    size exceeds `max_bytes`. Survives restarts; the size is re-counted on
+    first use.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _path(self, namespace, key):
+        return self.root / namespace / key[:2] / key
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        return [p for p in self.root.glob("*/*/*") if p.is_file() and not p.name.endswith(".tmp")]
+
+    def _ensure_size(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(p.stat().st_size for p in self._entries())
+
+    def get_bytes(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put_bytes(self, namespace, key, data: bytes) -> None:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+
+        with self._lock:
+            self._ensure_size()
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+        self._total_bytes = total
+
+    def get_text(self, namespace, key):
+        data = self.get_bytes(namespace, key)
+        return None if data is None else data.decode("utf-8")
+
+    def put_text(self, namespace, key, text: str) -> None:
+        self.put_bytes(namespace, key, text.encode("utf-8"))
+
+    def get_json(self, namespace, key):
+        data = self.get_bytes(namespace, key)
+        return None if data is None else json.loads(data)
+
+    def put_json(self, namespace, key, value) -> None:
+        self.put_bytes(namespace, key, json.dumps(value).encode("utf-8"))
+
+    def stats(self):
+        with self._lock:
+            self._ensure_size()
+            return {"root": str(self.root), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+extraction_cache = ContentCache()
+
+TEXT_NAMESPACE = "pdf_text"
+RULES_NAMESPACE = "rules_json"
+
+
+def pdf_text_key(pdf_bytes: bytes) -> str:
+    return content_hash(pdf_bytes)
+
+
+def rules_key(policy_text: str, extractor_identity: str) -> str:
+    return content_hash(normalize_policy_text(policy_text), extractor_identity)
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.storage.extraction_cache import content_hash
+
+RESULTS_DIR = Path(__file__).resolve().parents[1] / "cache" / "results"
+
+# Decoded (row_ids, rule_mask) arrays kept in memory for paging
+MAX_CACHED_RUNS = int(os.getenv("RESULTS_MAX_CACHED_RUNS", "8"))
+
+
+def run_id_for(dataset_path, dataset_version, rules_version) -> str:
+    """Same dataset file version + same rules version -> same run id"""
+    return content_hash(os.path.abspath(dataset_path), json.dumps(list(dataset_version)), rules_version)[:16]
+
+
+class ResultStore:
+    """
+    Violations of each policy run, stored by run id.
+
+    A run is a Parquet file with two columns, the positional row id of every
+    flagged transaction and its rule bitmask, plus a JSON sidecar with the
+    run's metadata (dataset path and version, rule ids, counts). Transaction
+    rows are not copied; pages are materialized from the resident dataset,
+    which must still be at the version the run was computed on.
+    """
+
+    def __init__(self, root=RESULTS_DIR, max_cached_runs=MAX_CACHED_RUNS):
+        self.root = Path(root)
+        self.max_cached_runs = max_cached_runs
+        self._arrays = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _paths(self, run_id):
+        return self.root / f"{run_id}.parquet", self.root / f"{run_id}.json"
+
+    def save(self, run_id, violations, meta: dict) -> dict:
+        """Store a violation frame (indexed by row_id, with rule_mask) under `run_id`"""
+        row_ids = violations.index.to_numpy(dtype=np.int64)
+        rule_mask = violations["rule_mask"].to_numpy()
+        meta = {
+            **meta,
+            "run_id": run_id,
+            "rule_ids": violations.attrs["rule_ids"],
+            "rule_counts": violations.attrs["rule_counts"],
+            "violations": len(row_ids),
+            "created_at": time.time(),
+        }
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        data_path, meta_path = self._paths(run_id)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        # Row ids only need 32 bits below 4B rows; sorted ids compress well
+        id_dtype = np.uint32 if len(row_ids) == 0 or row_ids[-1] < 2 ** 32 else np.int64
+        table = pa.table({"row_id": row_ids.astype(id_dtype), "rule_mask": rule_mask})
+        pq.write_table(table, f"{data_path}{suffix}", compression="zstd")
+        os.replace(f"{data_path}{suffix}", data_path)
+
+        # Sidecar last: a run is only visible once both files exist
+        with open(f"{meta_path}{suffix}", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}{suffix}", meta_path)
+
+        self._remember(run_id, (row_ids, rule_mask))
+        return meta
+
+    def exists(self, run_id) -> bool:
+        return self._paths(run_id)[1].exists()
+
+    def meta(self, run_id) -> dict:
+        """Run metadata; KeyError for unknown runs"""
+        meta_path = self._paths(run_id)[1]
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise KeyError(run_id)
+
+    def _remember(self, run_id, arrays):
+        with self._lock:
+            self._arrays[run_id] = arrays
+            self._arrays.move_to_end(run_id)
+            while len(self._arrays) > self.max_cached_runs:
+                self._arrays.popitem(last=False)
+
+    def arrays(self, run_id):
+        """(row_ids int64, rule_mask) of a run, sorted by row id"""
+        with self._lock:
+            arrays = self._arrays.get(run_id)
+            if arrays is not None:
+                self._arrays.move_to_end(run_id)
+                return arrays
+
+        data_path = self._paths(run_id)[0]
+        if not data_path.exists():
+            raise KeyError(run_id)
+        table = pq.read_table(data_path)
+        arrays = (
+            table.column("row_id").to_numpy().astype(np.int64),
+            table.column("rule_mask").to_numpy(),
+        )
+        self._remember(run_id, arrays)
+        return arrays
+
+    def runs(self):
+        """Metadata of every stored run, newest first"""
+        if not self.root.exists():
+            return []
+        metas = []
+        for path in self.root.glob("*.json"):
+            try:
+                metas.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return sorted(metas, key=lambda meta: meta["created_at"], reverse=True)
+
+    def delete(self, run_id) -> None:
+        with self._lock:
+            self._arrays.pop(run_id, None)
+        for path in self._paths(run_id):
+            path.unlink(missing_ok=True)
+
+
+result_store = ResultStore()
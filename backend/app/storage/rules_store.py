@@ -1,14 +1,168 @@
 import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from app.rule_engine.executors import with_rule_types
+from app.rule_engine.interpreter import compile_policy
+from app.storage.extraction_cache import content_hash
+
 RULES_DIR = Path(__file__).resolve().parents[1] / "rules"
 RULES_FILE = RULES_DIR / "latest_rules.json"
+VERSIONS_DIR = RULES_DIR / "versions"
+
+EMPTY_POLICY = {"policy_name": "None", "rules": []}
+
+
+def rules_version(data: dict) -> str:
+    """Content hash of a policy, independent of key order and formatting"""
+    return content_hash(json.dumps(data, sort_keys=True, separators=(",", ":")))[:16]
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """Write to a temp file next to `path`, fsync, then rename over it"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class RuleVersion:
+    version: str
+    policy: dict
+    saved_at: float = field(default_factory=time.time)
+
+    @property
+    def rules(self):
+        return self.policy["rules"]
+
+    def summary(self):
+        return {
+            "version": self.version,
+            "policy_name": self.policy.get("policy_name"),
+            "rules": len(self.rules),
+            "saved_at": self.saved_at,
+        }
+
+
+class RuleStore:
+    """
+    Versioned policy repository.
+
+    Every saved policy is kept as versions/<hash>.json (hash of its content,
+    so saving the same rules twice is a no-op), and latest_rules.json holds
+    the active one. Both are written atomically (temp file + rename), so a
+    crash never leaves a half-written file. The active version is kept in
+    memory: readers don't touch the disk, and the compiled plan of each
+    version is cached under its hash.
+    """
+
+    def __init__(self, rules_dir=RULES_DIR):
+        self.rules_dir = Path(rules_dir)
+        self.active_file = self.rules_dir / RULES_FILE.name
+        self.versions_dir = self.rules_dir / VERSIONS_DIR.name
+        self._lock = threading.Lock()
+        self._active = None
+        self._versions = {}
+        self._plans = {}
+
+    def _version_path(self, version):
+        return self.versions_dir / f"{version}.json"
+
+    def _load_active(self):
+        if not self.active_file.exists():
+            return RuleVersion(rules_version(EMPTY_POLICY), EMPTY_POLICY, saved_at=0.0)
+        policy = json.loads(self.active_file.read_text(encoding="utf-8"))
+        version = RuleVersion(rules_version(policy), policy, self.active_file.stat().st_mtime)
+        # Files written before versioning existed get their history entry now
+        if not self._version_path(version.version).exists():
+            _write_atomic(self._version_path(version.version), json.dumps(policy, indent=2))
+        return version
+
+    def current(self) -> RuleVersion:
+        """The active version, read from disk only on first use"""
+        active = self._active
+        if active is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self._load_active()
+                    self._versions[self._active.version] = self._active
+                active = self._active
+        return active
+
+    def save(self, data: dict, activate=True) -> RuleVersion:
+        """
+        Store `data` as a version (if new) and make it the active one. Every
+        rule is saved with its rule_type; ValueError if one has no executor.
+        """
+        data = with_rule_types(data)
+        compile_policy(data["rules"])
+        version = RuleVersion(rules_version(data), data)
+        text = json.dumps(data, indent=2)
+
+        with self._lock:
+            path = self._version_path(version.version)
+            if path.exists():
+                version.saved_at = path.stat().st_mtime
+            else:
+                _write_atomic(path, text)
+            version = self._versions.setdefault(version.version, version)
+            if activate:
+                _write_atomic(self.active_file, text)
+                self._active = version
+        return version
+
+    def get(self, version: str) -> RuleVersion:
+        """A stored version by hash; KeyError if there is none"""
+        with self._lock:
+            if version in self._versions:
+                return self._versions[version]
+        path = self._version_path(version)
+        if not path.exists():
+            raise KeyError(version)
+        policy = json.loads(path.read_text(encoding="utf-8"))
+        with self._lock:
+            return self._versions.setdefault(version, RuleVersion(version, policy, path.stat().st_mtime))
+
+    def activate(self, version: str) -> RuleVersion:
+        """Make an earlier version active again"""
+        return self.save(self.get(version).policy)
+
+    def versions(self):
+        """Summaries of all stored versions, newest first"""
+        if not self.versions_dir.exists():
+            return []
+        active = self.current().version
+        entries = []
+        for path in self.versions_dir.glob("*.json"):
+            try:
+                summary = self.get(path.stem).summary()
+            except (KeyError, ValueError):
+                continue
+            summary["active"] = summary["version"] == active
+            entries.append(summary)
+        return sorted(entries, key=lambda entry: entry["saved_at"], reverse=True)
+
+    def plan(self, version: RuleVersion = None):
+        """Compiled rule plan for a version (default: active), compiled once per hash"""
+        version = version or self.current()
+        plan = self._plans.get(version.version)
+        if plan is None:
+            plan = self._plans.setdefault(version.version, compile_policy(version.rules))
+        return plan
+
+
+rule_store = RuleStore()
+
 
 def save_rules_json(data: dict) -> None:
-    RULES_DIR.mkdir(parents=True, exist_ok=True)
-    RULES_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    rule_store.save(data)
 
 def load_rules_json() -> dict:
-    if not RULES_FILE.exists():
-        return {"policy_name": "None", "rules": []}
-    return json.loads(RULES_FILE.read_text(encoding="utf-8"))
\ No newline at end of file
+    return rule_store.current().policy
@@ -0,0 +1,185 @@
+# benchmarks/run_benchmarks.py
+"""
+Times each stage of the /run-demo pipeline on synthetic data and writes
+the results as JSON. Pass --compare with an earlier result file to fail
+(exit code 1) when a stage got slower than the allowed tolerance.
+
+    python -m benchmarks.run_benchmarks --rows 1000000 --out bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.rule_engine import compile_policy, compute_metrics, execute_policy, required_columns
+from app.rule_engine.context import ExecutionContext
+from app.rule_engine.datasets import file_version
+from app.rule_engine.executors import frequency_rows
+from app.rule_engine.loader import LABEL_COLUMN, convert_csv_to_parquet, load_dataset, load_rules
+
+from .synthetic import write_csv
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "rules", "latest_rules.json")
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_bytes():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Stages:
+    """Runs and records benchmark stages"""
+
+    def __init__(self, trace_memory, quiet=True):
+        self.trace_memory = trace_memory
+        self.quiet = quiet
+        self.results = []
+
+    def run(self, name, fn, repeat=1):
+        timings = []
+        peak = None
+        result = None
+        for _ in range(repeat):
+            if self.trace_memory:
+                tracemalloc.start()
+            arrow_before = pa.total_allocated_bytes()
+            output = io.StringIO() if self.quiet else sys.stdout
+
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(output):
+                result = fn()
+            timings.append(time.perf_counter() - started)
+
+            if self.trace_memory:
+                peak = max(peak or 0, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            arrow_bytes = pa.total_allocated_bytes() - arrow_before
+
+        self.results.append({
+            "stage": name,
+            "seconds": min(timings),
+            "seconds_all": timings,
+            "peak_traced_bytes": peak,
+            "arrow_allocated_bytes": arrow_bytes,
+            "max_rss_bytes": _max_rss_bytes(),
+        })
+        print(f"⏱️  {name:<28} {min(timings):9.4f}s")
+        return result
+
+
+def run(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="compliance-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    csv_path = os.path.join(work_dir, f"synthetic-{args.rows}.csv")
+    stages = Stages(trace_memory=args.trace_memory)
+
+    if not os.path.exists(csv_path):
+        stages.run("generate_csv", lambda: write_csv(
+            csv_path, args.rows, accounts=args.accounts, account_skew=args.account_skew,
+            time_skew=args.time_skew, seed=args.seed,
+        ))
+
+    rules = load_rules(RULES_PATH)["rules"]
+    columns = required_columns(rules) + [LABEL_COLUMN]
+
+    stages.run("load_dataset_csv", lambda: load_dataset(csv_path), repeat=args.repeat)
+    parquet_path = stages.run("convert_csv_to_parquet", lambda: convert_csv_to_parquet(csv_path))
+    df = stages.run("load_dataset_parquet", lambda: load_dataset(parquet_path, columns=columns), repeat=args.repeat)
+
+    frequency_rules = [rule for rule in rules if rule.get("time_window_minutes") is not None]
+    for rule in frequency_rules:
+        stages.run(f"frequency_rule_{rule['rule_id']}", lambda: frequency_rows(rule, ExecutionContext(df)), repeat=args.repeat)
+
+    stages.run("compile_policy", lambda: compile_policy(rules), repeat=args.repeat)
+    violations = stages.run("execute_policy_cold", lambda: execute_policy(rules, df), repeat=args.repeat)
+
+    # Warm run fills the derived-column cache, as on repeat /run-demo calls
+    context = ExecutionContext(df, version=file_version(parquet_path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        execute_policy(rules, df, context=context)
+    stages.run("execute_policy_warm", lambda: execute_policy(rules, df, context=context), repeat=args.repeat)
+    stages.run("compute_metrics", lambda: compute_metrics(df, violations), repeat=args.repeat)
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "pyarrow": pa.__version__,
+            "rows": args.rows,
+            "accounts": args.accounts,
+            "account_skew": args.account_skew,
+            "time_skew": args.time_skew,
+            "seed": args.seed,
+            "violations": len(violations),
+            "created_at": time.time(),
+        },
+        "stages": stages.results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Stages that got slower than baseline * (1 + tolerance)"""
+    previous = {stage["stage"]: stage["seconds"] for stage in baseline["stages"]}
+    regressions = []
+    for stage in current["stages"]:
+        before = previous.get(stage["stage"])
+        if before and stage["seconds"] > before * (1 + tolerance):
+            regressions.append({"stage": stage["stage"], "before": before, "after": stage["seconds"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rule engine pipeline")
+    parser.add_argument("--rows", type=int, default=100_000, help="10k up to 50M rows")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--account-skew", type=float, default=1.0)
+    parser.add_argument("--time-skew", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--work-dir", help="where synthetic files are kept (reused between runs)")
+    parser.add_argument("--trace-memory", action="store_true", help="record tracemalloc peaks (slower)")
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--compare", help="earlier result JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print("✅ Results written to", args.out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"❌ {r['stage']}: {r['before']:.4f}s → {r['after']:.4f}s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
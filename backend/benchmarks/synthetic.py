@@ -0,0 +1,136 @@
+# benchmarks/synthetic.py
+"""
+Synthetic transaction data in the HI-Small_Trans.csv schema.
+
+Data is generated chunk by chunk in time order, so files far larger than
+RAM (tens of millions of rows) can be written with bounded memory.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+PAYMENT_FORMATS = ["ACH", "Bitcoin", "Cash", "Cheque", "Credit Card", "Reinvestment", "Wire"]
+PAYMENT_WEIGHTS = [0.30, 0.02, 0.10, 0.12, 0.20, 0.06, 0.20]
+CURRENCIES = ["US Dollar", "Euro", "Yuan", "Rupee", "UK Pound"]
+CURRENCY_WEIGHTS = [0.6, 0.15, 0.1, 0.1, 0.05]
+
+START = np.datetime64("2022-09-01T00:00")
+
+
+def _account_weights(accounts, skew):
+    """Zipf-like activity: skew=0 is uniform, larger values favour few accounts"""
+    ranks = np.arange(1, accounts + 1, dtype=np.float64)
+    weights = ranks ** -skew
+    return weights / weights.sum()
+
+
+def _chunk_times(rng, n, start_min, end_min, time_skew, bursts):
+    """
+    Minute offsets in [start_min, end_min), sorted. A `time_skew` fraction of
+    the rows is squeezed into a few 5-minute bursts, the rest is uniform.
+    """
+    n_burst = int(n * time_skew)
+    uniform = rng.integers(start_min, end_min, n - n_burst)
+    if n_burst:
+        centers = rng.integers(start_min, max(start_min + 1, end_min - 5), bursts)
+        burst = rng.choice(centers, n_burst) + rng.integers(0, 5, n_burst)
+        uniform = np.concatenate([uniform, burst])
+    return np.sort(uniform)
+
+
+def generate_chunks(
+    rows,
+    accounts=10_000,
+    banks=100,
+    days=18,
+    account_skew=1.0,
+    time_skew=0.0,
+    laundering_rate=0.001,
+    chunk_rows=1_000_000,
+    seed=0,
+):
+    """Yield DataFrames in the AML transaction schema, in time order"""
+    rng = np.random.default_rng(seed)
+    account_ids = np.array([f"{i:09X}" for i in range(accounts)], dtype=object)
+    account_banks = rng.integers(1, banks + 1, accounts).astype(str).astype(object)
+    weights = _account_weights(accounts, account_skew)
+
+    total_minutes = days * 24 * 60
+    produced = 0
+    while produced < rows:
+        n = min(chunk_rows, rows - produced)
+        start_min = total_minutes * produced // rows
+        end_min = max(start_min + 1, total_minutes * (produced + n) // rows)
+
+        minutes = _chunk_times(rng, n, start_min, end_min, time_skew, bursts=max(1, n // 5_000))
+        # Format each distinct minute once instead of every row
+        distinct, inverse = np.unique(minutes, return_inverse=True)
+        labels = pd.Series(START + distinct.astype("timedelta64[m]")).dt.strftime("%Y/%m/%d %H:%M").to_numpy()
+        senders = rng.choice(accounts, n, p=weights)
+        receivers = rng.integers(0, accounts, n)
+        paid = np.round(rng.lognormal(mean=8, sigma=2.5, size=n), 2)
+        currency = rng.choice(CURRENCIES, n, p=CURRENCY_WEIGHTS)
+
+        yield pd.DataFrame({
+            "Timestamp": labels[inverse],
+            "From Bank": account_banks[senders],
+            "From Account": account_ids[senders],
+            "To Bank": account_banks[receivers],
+            "To Account": account_ids[receivers],
+            "Amount Received": paid,
+            "Receiving Currency": currency,
+            "Amount Paid": paid,
+            "Payment Currency": currency,
+            "Payment Format": rng.choice(PAYMENT_FORMATS, n, p=PAYMENT_WEIGHTS),
+            "is_laundering": (rng.random(n) < laundering_rate).astype(np.int8),
+        })
+        produced += n
+
+
+def write_csv(path, rows, **options):
+    """Write a synthetic dataset to `path`; returns the path"""
+    tmp_path = path + ".tmp"
+    write_options = pacsv.WriteOptions(quoting_style="needed")
+    writer = None
+    try:
+        for chunk in generate_chunks(rows, **options):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pacsv.CSVWriter(tmp_path, table.schema, write_options=write_options)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic AML transactions")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=18)
+    parser.add_argument("--account-skew", type=float, default=1.0)
+    parser.add_argument("--time-skew", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    write_csv(
+        args.path,
+        args.rows,
+        accounts=args.accounts,
+        days=args.days,
+        account_skew=args.account_skew,
+        time_skew=args.time_skew,
+        seed=args.seed,
+    )
+    print("✅ Wrote", args.rows, "rows to", args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the backend as `app`, the way uvicorn runs it
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def transactions():
+    """
+    Factory for small synthetic transaction frames with the dataset's column
+    names. Times fall on a coarse `step_minutes` grid so that many rows share
+    a timestamp; `late_minutes` moves rows back by up to that much, out of
+    row order.
+    """
+
+    def make(n=2000, accounts=40, start_minutes=0, span_minutes=3000, step_minutes=10, late_minutes=0, seed=0):
+        rng = np.random.default_rng(seed)
+        names = [f"A{i:03d}" for i in range(accounts)]
+        minutes = start_minutes + np.sort(rng.integers(0, span_minutes // step_minutes, n)) * step_minutes
+        if late_minutes:
+            minutes = minutes - rng.integers(0, late_minutes // step_minutes + 1, n) * step_minutes
+        return pd.DataFrame({
+            "Timestamp": pd.Timestamp("2022-09-01") + pd.to_timedelta(minutes, unit="min"),
+            "From Bank": rng.integers(1, 4, n),
+            "From Account": rng.choice(names, n),
+            "To Bank": rng.integers(1, 4, n),
+            "To Account": rng.choice(names, n),
+            "Amount Paid": rng.integers(1, 5000, n) * 1.25,
+            "Payment Format": rng.choice(["Cash", "Wire", "Cheque", "ACH"], n),
+        })
+
+    return make
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.rule_engine import execute_policy
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+
+def _flagged(rule, df):
+    violations = execute_policy([{"rule_id": "G1", "description": "Graph", **rule}], df)
+    return set(violations.index.tolist())
+
+
+def _edges(df):
+    """(row, sender, receiver, time) of transfers between two different known accounts"""
+    senders = df["From Account"].to_numpy(dtype=object)
+    receivers = df["To Account"].to_numpy(dtype=object)
+    times = df["Timestamp"].to_numpy(dtype="datetime64[ns]").view("int64")
+    return [
+        (i, senders[i], receivers[i], times[i])
+        for i in range(len(df))
+        if isinstance(receivers[i], str) and senders[i] != receivers[i]
+    ]
+
+
+def _brute_force_fan(df, side, threshold, window_minutes):
+    """Rows whose account has more than `threshold` distinct counterparties in its trailing window"""
+    edges = _edges(df)
+    flagged = set()
+    for row, sender, receiver, t in edges:
+        account = sender if side == "fan_out" else receiver
+        counterparties = {
+            (r if side == "fan_out" else s)
+            for j, s, r, u in edges
+            if (s if side == "fan_out" else r) == account
+            and (u < t or (u == t and j <= row))
+            and (window_minutes is None or u > t - window_minutes * NS_PER_MINUTE)
+        }
+        if len(counterparties) > threshold:
+            flagged.add(row)
+    return flagged
+
+
+def _brute_force_cycles(df, max_length, window_minutes):
+    """Rows on a 2- or 3-transfer cycle with non-decreasing times, starting from any of its edges"""
+    window = window_minutes * NS_PER_MINUTE
+    edges = _edges(df)
+    flagged = set()
+    for a in edges:
+        for b in edges:
+            if b[1] != a[2] or not a[3] <= b[3] <= a[3] + window:
+                continue
+            if b[2] == a[1]:
+                flagged |= {a[0], b[0]}
+            elif max_length == 3:
+                for c in edges:
+                    if c[1] == b[2] and c[2] == a[1] and b[3] <= c[3] <= a[3] + window:
+                        flagged |= {a[0], b[0], c[0]}
+    return flagged
+
+
+@pytest.fixture
+def transfers(transactions):
+    df = transactions(n=700, accounts=20, span_minutes=1500)
+    df.loc[df.index[::97], "To Account"] = None
+    return df
+
+
+@pytest.mark.parametrize("side,threshold,window_minutes", [
+    ("fan_out", 3, 60),
+    ("fan_in", 2, 30),
+    ("fan_out", 15, None),
+    ("fan_in", 6, 240),
+])
+def test_fan_rules_match_brute_force(transfers, side, threshold, window_minutes):
+    rule = {"graph": side, "counterparty_threshold": threshold, "time_window_minutes": window_minutes}
+    expected = _brute_force_fan(transfers, side, threshold, window_minutes)
+
+    assert expected
+    assert _flagged(rule, transfers) == expected
+
+
+@pytest.mark.parametrize("max_length,window_minutes", [(2, 60), (2, 0), (3, 40), (3, 10), (3, 0)])
+def test_cycle_rules_match_brute_force(transfers, max_length, window_minutes):
+    rule = {"graph": "cycle", "max_cycle_length": max_length, "time_window_minutes": window_minutes}
+    expected = _brute_force_cycles(transfers, max_length, window_minutes)
+
+    assert expected
+    assert _flagged(rule, transfers) == expected
+
+
+@pytest.mark.parametrize("minutes,is_cycle", [
+    ([10, 20, 5], True),    # C->A, A->B, B->C is in time order
+    ([10, 10, 10], True),   # simultaneous transfers close the cycle
+    ([10, 5, 20], False),   # no rotation has non-decreasing times
+    ([0, 20, 31], False),   # in order, but longer than the window
+])
+def test_three_cycle_rotations(minutes, is_cycle):
+    df = pd.DataFrame({
+        "Timestamp": pd.Timestamp("2022-09-01") + pd.to_timedelta(minutes, unit="min"),
+        "From Account": ["A", "B", "C"],
+        "To Account": ["B", "C", "A"],
+        "Amount Paid": 100.0,
+    })
+    rule = {"graph": "cycle", "max_cycle_length": 3, "time_window_minutes": 30}
+
+    assert _flagged(rule, df) == ({0, 1, 2} if is_cycle else set())
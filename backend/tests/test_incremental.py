@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.rule_engine import IncrementalState, execute_policy
+
+RULES = [
+    {"rule_id": "R1", "description": "Large amount", "field": "amount", "operator": ">", "threshold": 5000},
+    {"rule_id": "R2", "description": "Burst", "time_window_minutes": 60, "transaction_count_threshold": 2},
+    {"rule_id": "R3", "description": "Cash", "payment_methods": ["Cash"], "threshold": 2000},
+    {"rule_id": "R4", "description": "Daily burst", "time_window_minutes": 1440, "transaction_count_threshold": 8},
+]
+
+
+def _rule_masks(violations):
+    return dict(zip(violations.index.tolist(), violations["rule_mask"].tolist()))
+
+
+def _incremental_masks(df, bounds):
+    """Union of per-batch results (rule bits OR-ed per row) over growing prefixes of df"""
+    state = IncrementalState()
+    masks = {}
+    for stop in bounds:
+        for row_id, mask in _rule_masks(execute_policy(RULES, df.iloc[:stop], state=state)).items():
+            masks[row_id] = masks.get(row_id, 0) | mask
+    return masks
+
+
+@pytest.mark.parametrize("late_minutes", [0, 50])
+def test_incremental_batches_match_full_rescan(transactions, late_minutes):
+    df = transactions(late_minutes=late_minutes)
+    bounds = [1, 7, 300, 301, 950, 1500, 1999, len(df)]
+
+    assert _incremental_masks(df, bounds) == _rule_masks(execute_policy(RULES, df))
+
+
+def test_rows_older_than_the_window_tail_need_a_full_scan(transactions):
+    df = transactions(n=400)
+    state = IncrementalState()
+    execute_policy(RULES, df.iloc[:300], state=state)
+
+    # Move one appended row a few days before everything already seen
+    df.loc[350, "Timestamp"] = df["Timestamp"].min() - np.timedelta64(3, "D")
+    with pytest.raises(ValueError):
+        execute_policy(RULES, df, state=state)
+
+
+def test_compound_rules_with_frequency_windows_need_a_full_scan(transactions):
+    rules = RULES + [{
+        "rule_id": "R5", "description": "Burst of large payments",
+        "condition": {"all": [
+            {"time_window_minutes": 60, "transaction_count_threshold": 2},
+            {"field": "amount", "operator": ">", "value": 1000},
+        ]},
+    }]
+    with pytest.raises(ValueError, match="R5"):
+        execute_policy(rules, transactions(n=100), state=IncrementalState())
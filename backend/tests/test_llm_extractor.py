@@ -0,0 +1,97 @@
+import json
+import re
+
+import pytest
+
+from app.services import llm_extractor
+from app.services.llm_extractor import (
+    FakeBackend, RuleExtractor, _is_heading, merge_policy_rules, split_policy_sections,
+)
+
+
+def _section(number, limit, filler=3):
+    body = "".join(f"Transactions are reviewed under clause {number}.\n" for _ in range(filler))
+    return f"{number}. Clause {number}\nAmounts above LIMIT={limit} must be flagged.\n{body}"
+
+
+def _rule(rule_id, threshold, description="Large amount"):
+    return {"rule_id": rule_id, "description": description, "field": "amount", "operator": ">", "threshold": threshold}
+
+
+@pytest.mark.parametrize("line,heading", [
+    ("1. Purpose", True),
+    ("2) Scope", True),
+    ("2.3 Reporting duties", True),
+    ("Section 4 Monitoring", True),
+    ("§ 12 Records", True),
+    ("CASH TRANSACTIONS", True),
+    ("10000 USD within 24 hours must be reported.", False),
+    ("3 or more transfers to the same account", False),
+    ("2022 guidance applies", False),
+])
+def test_numbered_headings(line, heading):
+    assert _is_heading(line) == heading
+
+
+def test_small_sections_are_packed_without_losing_text():
+    text = "".join(_section(i, 1000 * i) for i in range(1, 21))
+    chunks = split_policy_sections(text, max_chars=600)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 600 for chunk in chunks)
+    assert "".join(chunks) == text
+    # Every chunk starts on a clause heading, none in the middle of one
+    assert all(re.match(r"\d+\. Clause", chunk) for chunk in chunks)
+
+
+def test_wrapped_lines_starting_with_a_number_stay_in_their_section():
+    rule = "2. Reporting\nCash deposits of\n10000 USD within 24 hours must be reported.\n"
+    text = _section(1, 5000) + rule
+    # Room for clause 1 plus the start of clause 2, but not all of it
+    chunks = split_policy_sections(text, max_chars=len(text) - 1)
+
+    assert chunks == [_section(1, 5000), rule]
+
+
+def test_oversized_sections_are_cut_on_paragraphs():
+    paragraphs = [f"Paragraph {i} " + "x" * 150 for i in range(10)]
+    text = "1. Long clause\n" + "\n\n".join(paragraphs) + "\n"
+    chunks = split_policy_sections(text, max_chars=400)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    assert "".join(chunks) == text
+    # Paragraphs are never cut in half
+    assert all(sum(paragraph in chunk for chunk in chunks) == 1 for paragraph in paragraphs)
+
+
+def test_merge_dedupes_and_renumbers():
+    merged = merge_policy_rules([
+        {"policy_name": "Policy", "rules": [_rule("R1", 1000), _rule("R2", 5000)]},
+        {"policy_name": "AML Policy", "rules": [_rule("R1", 1000.0, "Amounts over 1000"), _rule("R7", 20000)]},
+        {"policy_name": "Other", "rules": [{**_rule("R3", 5000), "operator": " > "}]},
+    ])
+
+    assert merged["policy_name"] == "AML Policy"
+    assert [(r["rule_id"], r["threshold"]) for r in merged["rules"]] == [("R1", 1000), ("R2", 5000), ("R3", 20000)]
+
+
+def test_extract_runs_chunks_on_the_backend_and_merges(monkeypatch):
+    monkeypatch.setattr(llm_extractor, "CHUNK_CHARS", 600)
+
+    def handler(prompt):
+        limits = re.findall(r"LIMIT=(\d+)", prompt)
+        return json.dumps({"policy_name": "AML Policy", "rules": [_rule("R1", int(limit)) for limit in limits]})
+
+    # Clauses 1-12 plus a repeat of clause 3's limit in clause 13
+    text = "".join(_section(i, 1000 * i) for i in range(1, 13)) + _section(13, 3000)
+    backend = FakeBackend(handler=handler)
+    extractor = RuleExtractor(backend, max_in_flight=3)
+    try:
+        policy = extractor.extract(text)
+    finally:
+        extractor.close()
+
+    assert backend.calls == len(split_policy_sections(text)) > 1
+    assert [r["threshold"] for r in policy["rules"]] == [1000 * i for i in range(1, 13)]
+    assert [r["rule_id"] for r in policy["rules"]] == [f"R{i}" for i in range(1, 13)]
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from app.rule_engine import execute_policy, execute_policy_parallel
+from app.rule_engine.parallel import shutdown_pools
+
+RULES = [
+    {"rule_id": "R1", "description": "Large amount", "field": "amount", "operator": ">", "threshold": 5000},
+    {"rule_id": "R2", "description": "Burst", "time_window_minutes": 60, "transaction_count_threshold": 2},
+    {"rule_id": "R3", "description": "Cash", "payment_methods": ["Cash"], "threshold": 2000},
+    {"rule_id": "R4", "description": "Cross bank", "sender_bank_field": "sender_bank", "receiver_bank_field": "receiver_bank"},
+    {
+        "rule_id": "R5", "description": "Daily volume", "aggregate": "sum",
+        "operator": ">", "threshold": 15000, "time_window_minutes": 1440,
+    },
+    {"rule_id": "R6", "description": "Fan out", "graph": "fan_out", "counterparty_threshold": 4, "time_window_minutes": 240},
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _pools():
+    yield
+    shutdown_pools()
+
+
+def _assert_same_violations(parallel, serial):
+    pd.testing.assert_index_equal(parallel.index, serial.index)
+    assert parallel["rule_mask"].tolist() == serial["rule_mask"].tolist()
+    assert parallel.attrs["rule_counts"] == serial.attrs["rule_counts"]
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_parallel_matches_serial(transactions, workers):
+    # Ten-minute grid, so windows see many tied timestamps across accounts
+    df = transactions(n=3000, accounts=30)
+    serial = execute_policy(RULES, df)
+
+    assert all(serial.attrs["rule_counts"].values())
+    _assert_same_violations(execute_policy_parallel(RULES, df, workers=workers), serial)
+
+
+def test_counterparty_windows_fall_back_to_serial(transactions):
+    df = transactions(n=1500, accounts=20)
+    rules = RULES + [{
+        "rule_id": "R7", "description": "Counterparty volume", "aggregate": "sum", "group_by": "counterparty",
+        "operator": ">", "threshold": 15000, "time_window_minutes": 1440,
+    }]
+
+    _assert_same_violations(execute_policy_parallel(rules, df, workers=2), execute_policy(rules, df))
@@ -0,0 +1,35 @@
+import operator
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.rule_engine.context import ExecutionContext
+from app.rule_engine.executors import threshold_rows
+from app.rule_engine.interpreter import mark_rows
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+THRESHOLDS = [49999.999, 50000.0, 50000.001, 100.0, 99.5, -1, 0, 1e9]
+
+
+def _flagged(df, op_symbol, threshold, version):
+    rule = {"rule_id": "R1", "field": "Amount Paid", "operator": op_symbol, "threshold": threshold}
+    flags = np.zeros(len(df), dtype=bool)
+    mark_rows(flags, threshold_rows(rule, ExecutionContext(df, version)))
+    return flags
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+@pytest.mark.parametrize("op_symbol", list(OPERATORS))
+def test_sorted_index_matches_compare(dtype, op_symbol):
+    amounts = np.array([50000.0, 100.0, np.nan, 99.5, 0.0, 50000.0, 1e9, 100.0])
+    df = pd.DataFrame({"Amount Paid": amounts.astype(dtype)})
+
+    for threshold in THRESHOLDS:
+        # float64 reference: thresholds are never rounded to the column's precision
+        expected = OPERATORS[op_symbol](amounts, threshold)
+        indexed = _flagged(df, op_symbol, threshold, version=(1, 1))
+        compared = _flagged(df, op_symbol, threshold, version=None)
+
+        np.testing.assert_array_equal(indexed, expected, err_msg=f"{op_symbol} {threshold}")
+        np.testing.assert_array_equal(compared, expected, err_msg=f"{op_symbol} {threshold}")
@@ -0,0 +1,64 @@
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from app.rule_engine import ParquetViolationSink, execute_policy, stream_policy
+
+RULES = [
+    {"rule_id": "R1", "description": "Large amount", "field": "amount", "operator": ">", "threshold": 5000},
+    {"rule_id": "R2", "description": "Burst", "time_window_minutes": 60, "transaction_count_threshold": 2},
+    {"rule_id": "R3", "description": "Cash", "payment_methods": ["Cash"], "threshold": 2000},
+]
+
+
+@pytest.fixture
+def dataset(tmp_path, transactions):
+    def write(df):
+        path = tmp_path / "transactions.parquet"
+        df.to_parquet(path, index=False)
+        return str(path)
+
+    return write
+
+
+def _masks_by_row(violations):
+    masks = {}
+    for row_id, mask in zip(violations.index.tolist(), violations["rule_mask"].tolist()):
+        masks[row_id] = masks.get(row_id, 0) | mask
+    return masks
+
+
+def test_streamed_violations_match_a_full_scan(tmp_path, transactions, dataset):
+    df = transactions(n=2000, late_minutes=50)
+    out = tmp_path / "violations.parquet"
+
+    summary = stream_policy(RULES, dataset(df), sink=ParquetViolationSink(str(out)), chunk_rows=300)
+
+    assert summary["chunks"] == 7
+    streamed = pq.read_table(out).to_pandas()
+    assert _masks_by_row(streamed) == _masks_by_row(execute_policy(RULES, df))
+
+
+def test_rules_that_need_a_full_scan_write_nothing(tmp_path, transactions, dataset):
+    rules = RULES + [{
+        "rule_id": "R4", "description": "Burst of large payments",
+        "condition": {"all": [
+            {"time_window_minutes": 60, "transaction_count_threshold": 2},
+            {"field": "amount", "operator": ">", "value": 1000},
+        ]},
+    }]
+    with pytest.raises(ValueError, match="R4"):
+        stream_policy(rules, dataset(transactions(n=500)), sink=ParquetViolationSink(str(tmp_path / "violations.parquet")))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["transactions.parquet"]
+
+
+def test_a_failing_chunk_aborts_the_sink(tmp_path, transactions, dataset):
+    df = transactions(n=1000)
+    # A row in the fourth chunk, days older than the frequency tail
+    df.loc[950, "Timestamp"] = df["Timestamp"].min() - np.timedelta64(3, "D")
+
+    with pytest.raises(ValueError):
+        stream_policy(RULES, dataset(df), sink=ParquetViolationSink(str(tmp_path / "violations.parquet")), chunk_rows=300)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["transactions.parquet"]
@@ -0,0 +1,66 @@
+import operator
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.rule_engine import execute_policy
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+GROUP_COLUMNS = {"account": "From Account", "counterparty": "To Account"}
+
+
+def _flagged(rule, df):
+    violations = execute_policy([{"rule_id": "W1", "description": "Window", **rule}], df)
+    flagged = np.zeros(len(df), dtype=bool)
+    flagged[violations.index.to_numpy()] = True
+    return flagged
+
+
+def _rolling_reference(df, rule):
+    """Per-group time-based pandas rolling window, rows in (group, time, row) order"""
+    rows = df.assign(_row=np.arange(len(df)))
+    if rule.get("amount_below") is not None:
+        rows = rows[rows["Amount Paid"] < rule["amount_below"]]
+    rows = rows.sort_values([GROUP_COLUMNS[rule.get("group_by", "account")], "Timestamp", "_row"], kind="stable")
+
+    flagged = np.zeros(len(df), dtype=bool)
+    for _, group in rows.groupby(GROUP_COLUMNS[rule.get("group_by", "account")]):
+        window = group.set_index("Timestamp")["Amount Paid"].rolling(f"{rule['time_window_minutes']}min")
+        values = getattr(window, rule["aggregate"])().to_numpy()
+        flagged[group["_row"].to_numpy()] = OPERATORS[rule["operator"]](values, rule["threshold"])
+    return flagged
+
+
+@pytest.mark.parametrize("rule", [
+    {"aggregate": "sum", "operator": ">", "threshold": 10000, "time_window_minutes": 1440},
+    {"aggregate": "sum", "operator": ">=", "threshold": 10000, "time_window_minutes": 1440, "amount_below": 5000},
+    {"aggregate": "sum", "operator": "<", "threshold": 500, "time_window_minutes": 30},
+    {"aggregate": "mean", "operator": ">=", "threshold": 3000, "time_window_minutes": 60},
+    {"aggregate": "mean", "operator": "<=", "threshold": 1250, "time_window_minutes": 120, "group_by": "counterparty"},
+    {"aggregate": "max", "operator": ">", "threshold": 6000, "time_window_minutes": 120, "group_by": "counterparty"},
+    {"aggregate": "max", "operator": "<", "threshold": 2500, "time_window_minutes": 600},
+    {"aggregate": "max", "operator": "<=", "threshold": 2500, "time_window_minutes": 10, "amount_below": 4000},
+])
+def test_window_aggregates_match_pandas_rolling(transactions, rule):
+    # Ten-minute grid: many rows share a timestamp and sit exactly on a window edge
+    df = transactions(n=3000, accounts=25)
+    expected = _rolling_reference(df, rule)
+
+    assert expected.any()
+    np.testing.assert_array_equal(_flagged(rule, df), expected)
+
+
+def test_window_excludes_its_lower_edge_and_later_ties():
+    times = pd.Timestamp("2022-09-01") + pd.to_timedelta([0, 60, 60, 60, 119], unit="min")
+    df = pd.DataFrame({
+        "Timestamp": times,
+        "From Account": "A",
+        "To Account": "B",
+        "Amount Paid": [100.0, 100.0, 100.0, 100.0, 100.0],
+    })
+    rule = {"aggregate": "sum", "operator": ">=", "threshold": 300, "time_window_minutes": 60}
+
+    # Row 0 is exactly one window before rows 1-3; of the tied rows each sees
+    # itself and earlier ones only, and row 4 sees rows 1-4.
+    np.testing.assert_array_equal(_flagged(rule, df), [False, False, False, True, True])